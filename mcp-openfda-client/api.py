@@ -1,16 +1,26 @@
 import asyncio
-import json
+import hashlib
+import logging
 import os
-import uuid  # Added for session IDs
+import textwrap
+
+import httpx
+import secrets  # Session ID generation
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Header  # Added Header for session tracking
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+import orjson
+from cachetools import TLRUCache, TTLCache
+from pydantic import BaseModel, Field
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 from openai import AsyncOpenAI
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 from mcp.types import CallToolRequest
+from redis import asyncio as aioredis
 
 load_dotenv()
 
@@ -18,28 +28,294 @@ load_dotenv()
 REMOTE_SERVER_URL = "http://0.0.0.0:8000/sse"
 # UPDATE: Use a valid model name. 'gemini-3' is not valid.
 MODEL_NAME = "gemini-3-flash-preview"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", "3600"))  # Idle sessions expire after 1h
+SESSION_CACHE_MAX = int(os.getenv("SESSION_CACHE_MAX", "10000"))  # In-memory fallback bound
+
+# Shared HTTP/2 connection pool for all LLM calls: TLS handshakes amortize
+# across requests and concurrent calls multiplex on one connection.
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+    timeout=httpx.Timeout(60.0),
+)
 
 client_llm = AsyncOpenAI(
     api_key=os.environ.get("GEMINI_API_KEY"),
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+    http_client=http_client
 )
 
 # Global MCP State (Connection is shared, but state is not)
 mcp_session = None
-llm_tools = []
+llm_tools = ()
 
-# Session Store: { "session_id": [messages] }
-# In production, use Redis or a database.
-user_sessions = {}
+# Bulkhead on outbound LLM calls: a burst of users queues here instead of
+# tripping Gemini's RPM quota (the SDK itself retries 429s with backoff)
+LLM_SEM = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "20")))
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Initialize MCP connection on startup."""
-    global mcp_session, llm_tools
+# Request-path logging is lazy %-style so formatting is skipped entirely
+# when the level is off; startup messages keep plain prints.
+logger = logging.getLogger("openfda.api")
 
-    print(f"🔌 Connecting to MCP Server at {REMOTE_SERVER_URL}...")
+# Session Store: Redis-backed ("sess:{session_id}" -> JSON messages, TTL refresh on write)
+# so multiple workers share state and idle sessions expire automatically.
+# Falls back to a process-local store when Redis is unreachable (dev mode);
+# that fallback is a bounded LRU with TTL so a long-running process can't
+# leak memory across many users.
+redis_client = None
+user_sessions = TTLCache(maxsize=SESSION_CACHE_MAX, ttl=SESSION_TTL)
+
+
+async def load_session(session_id: str) -> list | None:
+    """Fetch a session's message history, or None if it doesn't exist."""
+    if redis_client:
+        raw = await redis_client.get(f"sess:{session_id}")
+        return orjson.loads(raw) if raw else None
+    return user_sessions.get(session_id)
+
+
+async def save_session(session_id: str, history: list):
+    """Persist a session's message history, refreshing its TTL."""
+    if redis_client:
+        await redis_client.set(f"sess:{session_id}", orjson.dumps(history), ex=SESSION_TTL)
+    else:
+        user_sessions[session_id] = history
+
+
+async def delete_session(session_id: str) -> bool:
+    """Remove a session. Returns True if it existed."""
+    if redis_client:
+        return bool(await redis_client.delete(f"sess:{session_id}"))
+    return user_sessions.pop(session_id, None) is not None
+
+
+# --- TOOL RESULT CACHE ---
+# General queries like get_critical_recalls(limit=5) return identical data
+# for every user within minutes; a short-TTL Redis cache skips the whole
+# MCP + FDA round-trip on hits. Label data is effectively static, recall and
+# shortage feeds change slowly, targeted searches get a short TTL.
+TOOL_CACHE_TTLS = {
+    "get_critical_recalls": 300,
+    "get_recent_drug_recalls": 300,
+    "get_recalls_by_classification": 300,
+    "get_current_drug_shortages": 300,
+    "get_drug_label": 86400,
+    "search_drug_labels": 86400,
+}
+DEFAULT_TOOL_CACHE_TTL = 60
+
+
+def _tool_cache_key(name: str, arguments: dict | None) -> str:
+    args_hash = hashlib.blake2b(
+        orjson.dumps(arguments or {}, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).hexdigest()
+    return f"tool:{name}:{args_hash}"
+
+
+def _tool_cache_ttu(key: str, value: str, now: float) -> float:
+    # Key format is "tool:{name}:{hash}"; look up the tool's TTL
+    name = key.split(":", 2)[1]
+    return now + TOOL_CACHE_TTLS.get(name, DEFAULT_TOOL_CACHE_TTL)
+
+
+# In-memory cache tier for when Redis is unreachable — LRU-bounded with
+# the same per-tool expiries as the Redis entries
+_tool_cache_local = TLRUCache(maxsize=512, ttu=_tool_cache_ttu)
+
+
+# In-flight identical tool calls are coalesced into one awaitable, so two
+# users asking "show me recent recalls" in the same second produce a single
+# upstream call (and the leader populates the Redis cache for both).
+_inflight: dict[str, asyncio.Task] = {}
+
+
+async def cached_call_tool(session, name: str, arguments: dict | None) -> str:
+    """Execute an MCP tool and return its text output, via the Redis cache.
+
+    Concurrent identical calls are deduplicated: followers await the task
+    started by the first caller instead of hitting the MCP server again.
+    """
+    key = _tool_cache_key(name, arguments)
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_call_tool_uncoalesced(session, name, arguments, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _t, _k=key: _inflight.pop(_k, None))
+    return await task
+
+
+async def _call_tool_uncoalesced(session, name: str, arguments: dict | None, key: str) -> str:
+    if redis_client:
+        cached = await redis_client.get(key)
+    else:
+        cached = _tool_cache_local.get(key)
+    if cached is not None:
+        return cached
+
+    result = await session.call_tool(name=name, arguments=arguments)
+    # Robust text extraction (handle multiple text blocks or empty content);
+    # skip the join entirely on the common single-block case
+    texts = [c.text for c in result.content if c.type == "text"]
+    tool_output = texts[0] if len(texts) == 1 else "\n".join(texts)
+
+    # Don't cache failures (the server reports them as "Error ..." strings) —
+    # a transient timeout would otherwise be served for the full tool TTL
+    if not tool_output.startswith("Error"):
+        if redis_client:
+            ttl = TOOL_CACHE_TTLS.get(name, DEFAULT_TOOL_CACHE_TTL)
+            await redis_client.setex(key, ttl, tool_output)
+        else:
+            _tool_cache_local[key] = tool_output
+
+    return tool_output
+
+
+def shrink_tool_output(s: str, max_chars: int = 4000) -> str:
+    """
+    Bound how much tool output enters the LLM context. FDA endpoints can
+    return tens of KB per call and everything appended to history is resent
+    on subsequent turns. Keeps the head (structured JSON carries its most
+    useful fields first) plus a short tail.
+    """
+    # Strip pretty-print indentation from JSON results before truncating —
+    # whitespace alone can be a third of what the server sends back
+    if s[:1] in ("{", "["):
+        try:
+            s = orjson.dumps(orjson.loads(s)).decode()
+        except orjson.JSONDecodeError:
+            pass
+    if len(s) <= max_chars:
+        return s
+    truncated = len(s) - 3800
+    return s[:3000] + f"\n...[truncated {truncated} chars]...\n" + s[-800:]
+
+
+def _trim_history(history: list, k_user_turns: int = 6, max_chars: int = 20000) -> list:
+    """
+    Bound what gets sent to the LLM: keep the system prompt plus the most
+    recent messages, stopping after k_user_turns user turns or max_chars of
+    content. Without this, every turn resends the whole session and token
+    cost grows quadratically over a long chat.
+
+    A 'tool' message is never kept without the assistant 'tool_calls' message
+    that produced it (orphaned tool roles cause provider 400 errors).
+    """
+    # Keep all leading system messages (the prompt plus any rolling summary)
+    head = []
+    while len(head) < len(history) and history[len(head)].get("role") == "system":
+        head.append(history[len(head)])
+    tail = history[len(head):]
+
+    kept = []
+    user_turns = 0
+    chars = 0
+    for msg in reversed(tail):
+        kept.append(msg)
+        content = msg.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        if msg.get("role") == "user":
+            user_turns += 1
+            if user_turns >= k_user_turns or chars >= max_chars:
+                break
+
+    kept.reverse()
+
+    # Never start the window on an orphaned tool result
+    while kept and kept[0].get("role") == "tool":
+        kept.pop(0)
+
+    return head + kept
+
+
+# --- ROLLING SUMMARIZATION ---
+# Pure truncation forgets early instructions (drug names, patient context).
+# Once a history gets long, compress the oldest turns into one summary
+# message so that context survives at a fixed token cost.
+SUMMARY_THRESHOLD = 30  # summarize once history exceeds this many messages
+SUMMARY_BATCH = 14      # how many of the oldest messages to compress
+
+# Bounded + TTL'd like user_sessions (session ids are client-supplied)
+_summary_locks: TTLCache = TTLCache(maxsize=SESSION_CACHE_MAX, ttl=SESSION_TTL)
+
+
+async def _summarize_history(session_id: str, history: list) -> list:
+    """Compress the oldest turns into a single summary system message."""
+    if len(history) <= SUMMARY_THRESHOLD:
+        return history
+
+    # Per-session lock so two concurrent requests don't double-summarize
+    lock = _summary_locks.get(session_id) or asyncio.Lock()
+    _summary_locks[session_id] = lock
+    async with lock:
+        if len(history) <= SUMMARY_THRESHOLD:
+            return history
+
+        # Never cut inside an assistant tool_calls / tool result exchange
+        cut = 1 + SUMMARY_BATCH
+        while cut < len(history) and history[cut].get("role") == "tool":
+            cut += 1
+
+        old = history[1:cut]
+        dump = "\n".join(f"{m.get('role')}: {m.get('content') or ''}" for m in old)
+
+        try:
+            async with LLM_SEM:
+                summary_resp = await client_llm.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=[{
+                        "role": "user",
+                        "content": "Summarize this conversation excerpt briefly, keeping "
+                                   "drug names, recall details, and user context:\n" + dump
+                    }]
+                )
+            summary = summary_resp.choices[0].message.content or ""
+        except Exception as e:
+            # Summarization is best-effort; keep the full history on failure
+            logger.warning("History summarization failed: %s", e)
+            return history
+
+        return (
+            history[:1]
+            + [{"role": "system", "content": "Prior conversation summary: " + summary}]
+            + history[cut:]
+        )
+
+
+# --- PER-SESSION LOCKS ---
+# If a client double-clicks send, two coroutines enter chat() with the same
+# session_id and race on the history (interleaved appends break the
+# tool_call/tool pairing and the provider rejects the request with a 400).
+# Bounded like user_sessions: session ids are client-supplied, so a plain
+# dict would grow without limit. Re-inserting on access refreshes the TTL,
+# so a lock only expires after the same idle period as its session.
+session_locks: TTLCache = TTLCache(maxsize=SESSION_CACHE_MAX, ttl=SESSION_TTL)
+_locks_guard = asyncio.Lock()
+
+
+async def get_session_lock(session_id: str) -> asyncio.Lock:
+    async with _locks_guard:
+        lock = session_locks.get(session_id) or asyncio.Lock()
+        session_locks[session_id] = lock
+        return lock
+
+
+
+# --- MCP CONNECTION MANAGEMENT ---
+# One SSE connection is shared by every request; if it drops (network blip,
+# server redeploy) each chat would 503 until a restart. Reconnection is
+# centralized behind a lock so a burst of failing requests triggers a single
+# reopen, and a heartbeat probes the link between requests to keep it warm.
+MCP_HEARTBEAT_INTERVAL = 30.0
+_mcp_reconnect_lock = asyncio.Lock()
+
+
+async def _connect_mcp(app: FastAPI) -> int:
+    """Open the SSE stream + MCP session and refresh the tool schemas."""
+    global mcp_session, llm_tools
 
-    # Keep connection alive
     app.state.sse_streams = sse_client(REMOTE_SERVER_URL)
     streams = await app.state.sse_streams.__aenter__()
 
@@ -47,26 +323,120 @@ async def lifespan(app: FastAPI):
     mcp_session = await app.state.client_session.__aenter__()
     await mcp_session.initialize()
 
-    # Fetch tools once on startup
+    # Built (and frozen) once per connection: every completions.create call
+    # reuses this same object by reference, so the SDK never re-builds the
+    # schema list per request. Rebuilding here keeps llm_tools in sync if a
+    # reconnection lands on a server with a different tool set.
     mcp_tools = await mcp_session.list_tools()
-    llm_tools = [{
+    llm_tools = tuple({
         "type": "function",
         "function": {
             "name": tool.name,
-            "description": tool.description,
+            # Cap descriptions — they ride along on every completion request
+            "description": textwrap.shorten(tool.description or "", width=240, placeholder=" ..."),
             "parameters": tool.inputSchema
         }
-    } for tool in mcp_tools.tools]
+    } for tool in mcp_tools.tools)
+    return len(mcp_tools.tools)
+
+
+async def _teardown_mcp(app: FastAPI):
+    """Close the MCP session and SSE stream, tolerating an already-dead link."""
+    global mcp_session
+    mcp_session = None
+    try:
+        await app.state.client_session.__aexit__(None, None, None)
+    except Exception:
+        pass
+    try:
+        await app.state.sse_streams.__aexit__(None, None, None)
+    except Exception:
+        pass
+
+
+async def _reconnect_mcp(app: FastAPI):
+    """Tear down and reopen the shared MCP connection (single-flight)."""
+    async with _mcp_reconnect_lock:
+        if mcp_session is not None:
+            # Another coroutine may have reconnected while we waited for the
+            # lock; a successful probe means there is nothing left to do
+            try:
+                await mcp_session.list_tools()
+                return
+            except Exception:
+                pass
+        await _teardown_mcp(app)
+        tool_count = await _connect_mcp(app)
+        print(f"🔄 Reconnected to MCP server ({tool_count} tools).")
 
-    print(f"✅ Loaded {len(mcp_tools.tools)} tools. API Ready!")
+
+async def call_tool_safe(name: str, arguments: dict | None) -> str:
+    """cached_call_tool with one reconnect-and-retry on connection failure."""
+    try:
+        return await cached_call_tool(mcp_session, name, arguments)
+    except Exception:
+        await _reconnect_mcp(app)
+        return await cached_call_tool(mcp_session, name, arguments)
+
+
+async def mcp_heartbeat(app: FastAPI):
+    """Probe the shared session periodically and reconnect if the link died."""
+    while True:
+        await asyncio.sleep(MCP_HEARTBEAT_INTERVAL)
+        try:
+            await mcp_session.list_tools()
+        except Exception as e:
+            logger.warning("MCP heartbeat failed (%s); reconnecting", e)
+            try:
+                await _reconnect_mcp(app)
+            except Exception as e:
+                logger.error("MCP reconnection failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize MCP connection on startup."""
+    global redis_client
+
+    # Connect to Redis (optional — fall back to in-memory sessions if unavailable)
+    try:
+        redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+        await redis_client.ping()
+        print(f"✅ Connected to Redis at {REDIS_URL}")
+    except Exception as e:
+        print(f"⚠️ Redis unavailable ({e}). Using in-memory sessions.")
+        redis_client = None
+
+    print(f"🔌 Connecting to MCP Server at {REMOTE_SERVER_URL}...")
+
+    tool_count = await _connect_mcp(app)
+    print(f"✅ Loaded {tool_count} tools. API Ready!")
+
+    heartbeat_task = asyncio.create_task(mcp_heartbeat(app))
 
     yield
 
     # Cleanup
-    await app.state.client_session.__aexit__(None, None, None)
-    await app.state.sse_streams.__aexit__(None, None, None)
+    heartbeat_task.cancel()
+    await _teardown_mcp(app)
+    if redis_client:
+        await redis_client.aclose()
+    await http_client.aclose()
 
-app = FastAPI(title="OpenFDA Chat API", lifespan=lifespan)
+
+
+class _NonStreamingGZipMiddleware(GZipMiddleware):
+    """GZip for JSON endpoints only — compressing the SSE stream breaks
+    incremental delivery through some proxies, so /chat/stream is skipped."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app = FastAPI(title="OpenFDA Chat API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -76,9 +446,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(_NonStreamingGZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Shared by reference in every new session's history. history.append only
+# mutates the list, never this dict — if future code edits history[0] in
+# place, copy it first.
+SYSTEM_MSG = {"role": "system", "content": "You are a helpful assistant. Use available tools."}
+
+
 class ChatRequest(BaseModel):
     message: str
-    session_id: str | None = None # Frontend can send an ID to resume chat
+    # Frontend can send an ID to resume chat; bounded so arbitrary
+    # client input can't become an oversized Redis key
+    session_id: str | None = Field(default=None, max_length=64)
 
 class ChatResponse(BaseModel):
     response: str
@@ -88,37 +468,53 @@ class ChatResponse(BaseModel):
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    global user_sessions
-
     if not mcp_session:
         raise HTTPException(status_code=503, detail="MCP session not initialized")
 
     # 1. Handle Session
-    session_id = request.session_id or str(uuid.uuid4())
-    
-    if session_id not in user_sessions:
+    session_id = request.session_id or secrets.token_urlsafe(16)
+
+    # Serialize concurrent requests for the same session
+    async with await get_session_lock(session_id):
+        return await _chat_turn(session_id, request)
+
+
+async def _chat_turn(session_id: str, request: ChatRequest) -> ChatResponse:
+    """Run one non-streaming chat turn. Caller holds the session lock."""
+    history = await load_session(session_id)
+    if history is None:
         # Initialize new history for this user
-        user_sessions[session_id] = [
-            {"role": "system", "content": "You are a helpful assistant. Use available tools."}
-        ]
-    
-    # Get this user's specific history
-    history = user_sessions[session_id]
+        history = [SYSTEM_MSG]
+
     history.append({"role": "user", "content": request.message})
 
+    # Compress the oldest turns once the session gets long
+    history = await _summarize_history(session_id, history)
+
     # 2. Ask LLM
     try:
-        response = await client_llm.chat.completions.create(
-            model=MODEL_NAME,
-            messages=history,
-            tools=llm_tools,
-            tool_choice="auto"
-        )
+        async with LLM_SEM:
+            response = await client_llm.chat.completions.create(
+                model=MODEL_NAME,
+                messages=_trim_history(history),
+                tools=llm_tools,
+                tool_choice="auto"
+            )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM Error: {str(e)}")
 
     msg = response.choices[0].message
-    history.append(msg) # Save thought process
+    # Save the thought process in the minimal wire shape (same as the
+    # streaming path): stable JSON for Redis and nothing extraneous for the
+    # SDK to re-serialize on later turns
+    assistant_msg = {"role": "assistant", "content": msg.content}
+    if msg.tool_calls:
+        assistant_msg["tool_calls"] = [{
+            "id": tc.id,
+            "type": "function",
+            "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+        } for tc in msg.tool_calls]
+    history.append(assistant_msg)
 
     tool_used = None
     tool_args = None
@@ -126,52 +522,65 @@ async def chat(request: ChatRequest):
     # 3. Handle Tool Calls
     if msg.tool_calls:
         tool_used = msg.tool_calls[0].function.name
-        
+
+        # Safe JSON parsing up front so one bad call doesn't break the batch
+        parsed_calls = []
         for tool_call in msg.tool_calls:
-            # Safe JSON parsing
             try:
-                args = json.loads(tool_call.function.arguments)
+                args = orjson.loads(tool_call.function.arguments)
                 tool_args = args
-            except json.JSONDecodeError:
-                history.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": "Error: Invalid JSON arguments generated."
-                })
-                continue
+                parsed_calls.append((tool_call, args))
+            except orjson.JSONDecodeError:
+                parsed_calls.append((tool_call, None))
 
-            print(f"🛠️ Executing {tool_call.function.name} for Session {session_id}...")
+        async def execute_tool(tool_call, args):
+            logger.info("Executing %s for session %s", tool_call.function.name, session_id)
+            return await call_tool_safe(tool_call.function.name, args)
 
-            # Execute Tool (Safe Call)
-            try:
-                result = await mcp_session.call_tool(
-                    name=tool_call.function.name,
-                    arguments=args
-                )
-                # Robust text extraction (handle multiple text blocks or empty content)
-                tool_output = "\n".join(
-                    [c.text for c in result.content if c.type == "text"]
-                )
-            except Exception as e:
-                tool_output = f"Error executing tool: {str(e)}"
+        # Dispatch all tool calls concurrently — parallel calls shouldn't serialize
+        results = iter(await asyncio.gather(
+            *[execute_tool(tc, args) for tc, args in parsed_calls if args is not None],
+            return_exceptions=True
+        ))
 
+        tool_outputs = []
+        for tool_call, args in parsed_calls:
+            if args is None:
+                tool_output = "Error: Invalid JSON arguments generated."
+            else:
+                outcome = next(results)
+                if isinstance(outcome, BaseException):
+                    tool_output = f"Error executing tool: {str(outcome)}"
+                else:
+                    tool_output = outcome
+
+            tool_outputs.append(tool_output)
             history.append({
                 "role": "tool",
                 "tool_call_id": tool_call.id,
-                "content": tool_output
+                "content": shrink_tool_output(tool_output)
             })
 
-        # 4. Get Final Answer
-        final_response = await client_llm.chat.completions.create(
-            model=MODEL_NAME,
-            messages=history
-        )
-        bot_response = final_response.choices[0].message.content or ""
-        history.append({"role": "assistant", "content": bot_response})
+        if all(o.startswith("Error") for o in tool_outputs):
+            # Every tool failed — there's nothing for the model to summarize,
+            # so skip the second LLM round-trip entirely
+            bot_response = "I couldn't fetch data: " + tool_outputs[0]
+            history.append({"role": "assistant", "content": bot_response})
+        else:
+            # 4. Get Final Answer
+            async with LLM_SEM:
+                final_response = await client_llm.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=_trim_history(history)
+                )
+            bot_response = final_response.choices[0].message.content or ""
+            history.append({"role": "assistant", "content": bot_response})
     else:
         bot_response = msg.content or ""
         history.append({"role": "assistant", "content": bot_response})
 
+    await save_session(session_id, history)
+
     return ChatResponse(
         response=bot_response,
         session_id=session_id,
@@ -179,10 +588,195 @@ async def chat(request: ChatRequest):
         tool_args=tool_args
     )
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint. Returns SSE events as the response is generated,
+    so the user sees tokens at first-token latency instead of waiting for the
+    full formatted answer.
+
+    Events:
+    - text_delta: incremental text chunk from the model
+    - tool_start: MCP tool execution beginning
+    - tool_end: MCP tool execution complete
+    - done: stream complete with session metadata
+    - error: an error occurred
+    """
+    if not mcp_session:
+        raise HTTPException(status_code=503, detail="MCP session not initialized")
+
+    session_id = request.session_id or secrets.token_urlsafe(16)
+
+    async def stream_completion(messages, use_tools=True):
+        """Stream one completion, yielding ('text', chunk) and accumulating tool calls."""
+        # Omit the tool parameters entirely on the no-tools pass: an explicit
+        # None is serialized as JSON null by the SDK, not dropped
+        kwargs = {"tools": llm_tools, "tool_choice": "auto"} if use_tools else {}
+        async with LLM_SEM:
+            response = await client_llm.chat.completions.create(
+                model=MODEL_NAME,
+                messages=messages,
+                stream=True,
+                **kwargs
+            )
+        async for chunk in response:
+            if chunk.choices:
+                yield chunk.choices[0].delta
+
+    async def event_generator():
+        # Serialize concurrent requests for the same session
+        lock = await get_session_lock(session_id)
+        await lock.acquire()
+        try:
+            history = await load_session(session_id)
+            if history is None:
+                history = [SYSTEM_MSG]
+            history.append({"role": "user", "content": request.message})
+            history = await _summarize_history(session_id, history)
+
+            tool_used = None
+            tool_args = None
+
+            # 1. First pass — stream text and accumulate any tool-call deltas
+            text_parts = []
+            tool_calls = {}  # index -> {"id", "name", "arguments"}
+            async for delta in stream_completion(_trim_history(history)):
+                if delta.content:
+                    text_parts.append(delta.content)
+                    yield ServerSentEvent(
+                        data=orjson.dumps({"text": delta.content}).decode(),
+                        event="text_delta"
+                    )
+                for tc in delta.tool_calls or []:
+                    entry = tool_calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                    if tc.id:
+                        entry["id"] = tc.id
+                    if tc.function and tc.function.name:
+                        entry["name"] = tc.function.name
+                    if tc.function and tc.function.arguments:
+                        entry["arguments"] += tc.function.arguments
+
+            if tool_calls:
+                calls = [tool_calls[i] for i in sorted(tool_calls)]
+                tool_used = calls[0]["name"]
+
+                # Record the assistant turn that requested the tools
+                history.append({
+                    "role": "assistant",
+                    "content": "".join(text_parts) or None,
+                    "tool_calls": [{
+                        "id": c["id"],
+                        "type": "function",
+                        "function": {"name": c["name"], "arguments": c["arguments"]}
+                    } for c in calls]
+                })
+
+                # 2. Execute tools concurrently (same pattern as /chat)
+                parsed_calls = []
+                for c in calls:
+                    try:
+                        args = orjson.loads(c["arguments"])
+                        tool_args = args
+                    except orjson.JSONDecodeError:
+                        args = None
+                    parsed_calls.append((c, args))
+                    yield ServerSentEvent(
+                        data=orjson.dumps({"tool_name": c["name"], "tool_args": args}).decode(),
+                        event="tool_start"
+                    )
+
+                results = iter(await asyncio.gather(
+                    *[call_tool_safe(c["name"], args)
+                      for c, args in parsed_calls if args is not None],
+                    return_exceptions=True
+                ))
+
+                for c, args in parsed_calls:
+                    if args is None:
+                        tool_output = "Error: Invalid JSON arguments generated."
+                        success = False
+                    else:
+                        outcome = next(results)
+                        if isinstance(outcome, BaseException):
+                            tool_output = f"Error executing tool: {str(outcome)}"
+                            success = False
+                        else:
+                            tool_output = outcome
+                            success = True
+
+                    history.append({
+                        "role": "tool",
+                        "tool_call_id": c["id"],
+                        "content": shrink_tool_output(tool_output)
+                    })
+                    yield ServerSentEvent(
+                        data=orjson.dumps({"tool_name": c["name"], "success": success}).decode(),
+                        event="tool_end"
+                    )
+
+                # 3. Final pass — stream the answer grounded on tool results
+                final_parts = []
+                async for delta in stream_completion(_trim_history(history), use_tools=False):
+                    if delta.content:
+                        final_parts.append(delta.content)
+                        yield ServerSentEvent(
+                            data=orjson.dumps({"text": delta.content}).decode(),
+                            event="text_delta"
+                        )
+                history.append({"role": "assistant", "content": "".join(final_parts)})
+            else:
+                history.append({"role": "assistant", "content": "".join(text_parts)})
+
+            await save_session(session_id, history)
+
+            yield ServerSentEvent(
+                data=orjson.dumps({
+                    "session_id": session_id,
+                    "tool_used": tool_used,
+                    "tool_args": tool_args
+                }).decode(),
+                event="done"
+            )
+
+        except Exception as e:
+            logger.error("Streaming error: %s", e)
+            yield ServerSentEvent(
+                data=orjson.dumps({"message": str(e)}).decode(),
+                event="error"
+            )
+        finally:
+            lock.release()
+
+    return EventSourceResponse(
+        event_generator(),
+        headers={
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-cache",
+        },
+        ping=15,
+    )
+
+
+@app.get("/admin/stats")
+async def admin_stats():
+    """Session-store occupancy, for capacity monitoring."""
+    if redis_client:
+        # SCAN is O(keys), but this is an occasional admin endpoint
+        count = 0
+        async for _ in redis_client.scan_iter(match="sess:*", count=1000):
+            count += 1
+        return {"backend": "redis", "sessions": count}
+    return {
+        "backend": "memory",
+        "sessions": user_sessions.currsize,
+        "max_sessions": user_sessions.maxsize,
+    }
+
+
 @app.delete("/chat/{session_id}")
 async def clear_session(session_id: str):
     """Clear history for a specific user."""
-    if session_id in user_sessions:
-        del user_sessions[session_id]
+    session_locks.pop(session_id, None)
+    if await delete_session(session_id):
         return {"status": "cleared"}
     raise HTTPException(status_code=404, detail="Session not found")
\ No newline at end of file
@@ -1,41 +1,290 @@
 
 import asyncio
-import json
+import hashlib
+import logging
 import os
-import uuid
+import random
+import re
+import secrets
+import textwrap
+
+import httpx
 from contextlib import asynccontextmanager
 from typing import List, Optional, Dict, Any
 
+import orjson
+from cachetools import TLRUCache, TTLCache
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
 from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 # Native Gemini SDK (Latest v1.0.0+)
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 
 # MCP Imports
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 
+from redis import asyncio as aioredis
+
 # Load environment variables
 load_dotenv()
 
 # --- CONFIGURATION ---
 REMOTE_SERVER_URL = os.getenv("REMOTE_SERVER_URL", "http://0.0.0.0:8000/sse")
 MODEL_NAME = "gemini-3-pro-preview"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", "3600"))  # Idle sessions expire after 1h
+SESSION_CACHE_MAX = int(os.getenv("SESSION_CACHE_MAX", "10000"))  # In-memory fallback bound
+
+# Request-path logging is lazy %-style so formatting is skipped entirely
+# when the level is off; startup messages keep plain prints.
+logger = logging.getLogger("openfda.client")
+
+# Bulkhead around Gemini: cap in-flight model calls per instance so a wide
+# Cloud Run scale-out shares the project's RPM/TPM quota instead of
+# triggering cascading 429 retries.
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "20"))
+gemini_sem = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+
+async def gemini_call(coro_factory, max_attempts: int = 5):
+    """Run a Gemini call under the concurrency bulkhead, retrying 429s
+    with exponential backoff + jitter."""
+    for attempt in range(max_attempts):
+        async with gemini_sem:
+            try:
+                return await coro_factory()
+            except genai_errors.APIError as e:
+                if e.code != 429 or attempt == max_attempts - 1:
+                    raise
+        await asyncio.sleep(random.uniform(1.0, 2.0) * 2 ** attempt)
+
+
+# SSE micro-batching for /chat/stream text deltas
+SSE_BATCH_SIZE = 8       # flush after this many deltas
+SSE_BATCH_INTERVAL = 0.05  # ...or after 50ms, whichever comes first
+
+# Connection-pool caps for the httpx clients behind MCP SSE streams. The
+# library defaults (100 total / 20 keepalive / 5s expiry) exhaust under
+# concurrent /chat load; these are tunable per deployment.
+MCP_CLIENT_MAX_CONNECTIONS = int(os.getenv("MCP_CLIENT_MAX_CONNECTIONS", "500"))
+MCP_CLIENT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MCP_CLIENT_MAX_KEEPALIVE_CONNECTIONS", "100"))
+MCP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("MCP_CLIENT_KEEPALIVE_EXPIRY", "30.0"))
+
+
+def _mcp_http_client_factory(headers=None, timeout=None, auth=None) -> httpx.AsyncClient:
+    """httpx factory handed to sse_client so every MCP connection gets the
+    tuned pool limits instead of the httpx defaults."""
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=timeout if timeout is not None else httpx.Timeout(30.0),
+        auth=auth,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=MCP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=MCP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=MCP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+    )
 
 
 @asynccontextmanager
 async def get_mcp_session():
-    """Create a fresh MCP session via SSE for each request."""
-    async with sse_client(REMOTE_SERVER_URL) as streams:
+    """Create a fresh MCP session via SSE (used for startup discovery)."""
+    async with sse_client(REMOTE_SERVER_URL, httpx_client_factory=_mcp_http_client_factory) as streams:
         async with ClientSession(streams[0], streams[1]) as session:
             await session.initialize()
             yield session
 
 
+class _PooledSession:
+    """A live SSE stream + initialized ClientSession held by the pool."""
+
+    def __init__(self, sse_ctx, session_ctx, session: ClientSession):
+        self.sse_ctx = sse_ctx
+        self.session_ctx = session_ctx
+        self.session = session
+
+    async def close(self):
+        try:
+            await self.session_ctx.__aexit__(None, None, None)
+            await self.sse_ctx.__aexit__(None, None, None)
+        except Exception:
+            pass  # Connection already dead; nothing to clean up
+
+
+class MCPPool:
+    """
+    Pool of live MCP sessions so each request reuses an established SSE
+    stream instead of paying the handshake + initialize round-trips.
+
+    Sessions are created lazily up to max_size. release() health-probes the
+    session (list_tools with a 1s timeout) and discards dead ones, so the
+    pool self-heals after an MCP server restart.
+    """
+
+    def __init__(self, url: str, min_size: int = 2, max_size: int = 10):
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+        self._idle: asyncio.Queue[_PooledSession] = asyncio.Queue()
+        self._size = 0
+        self._lock = asyncio.Lock()
+
+    async def _create(self) -> _PooledSession:
+        sse_ctx = sse_client(self.url, httpx_client_factory=_mcp_http_client_factory)
+        streams = await sse_ctx.__aenter__()
+        session_ctx = ClientSession(streams[0], streams[1])
+        session = await session_ctx.__aenter__()
+        await session.initialize()
+        return _PooledSession(sse_ctx, session_ctx, session)
+
+    async def start(self):
+        """Prewarm min_size sessions so the first requests skip the handshake."""
+        for _ in range(self.min_size):
+            try:
+                self._idle.put_nowait(await self._create())
+                self._size += 1
+            except Exception as e:
+                print(f"✗ MCP pool prewarm failed: {e}")
+                break
+        print(f"✓ MCP pool ready ({self._size} warm sessions)")
+
+    @asynccontextmanager
+    async def acquire(self):
+        pooled = await self._get()
+        try:
+            yield pooled.session
+        finally:
+            await self._release(pooled)
+
+    async def _get(self) -> _PooledSession:
+        try:
+            return self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        async with self._lock:
+            if self._size < self.max_size:
+                self._size += 1
+                try:
+                    return await self._create()
+                except Exception:
+                    self._size -= 1
+                    raise
+        # Pool exhausted — wait for a session to be released
+        return await self._idle.get()
+
+    async def _release(self, pooled: _PooledSession):
+        # Health-probe before returning to the pool; replace dead sessions
+        try:
+            async with asyncio.timeout(1.0):
+                await pooled.session.list_tools()
+        except Exception:
+            await pooled.close()
+            async with self._lock:
+                self._size -= 1
+            return
+        self._idle.put_nowait(pooled)
+
+    async def close(self):
+        while not self._idle.empty():
+            await self._idle.get_nowait().close()
+        self._size = 0
+
+
+# MCP health is probed in the background; /health serves the cached flag.
+HEALTH_PROBE_INTERVAL = 10.0
+HEALTH_FAILURE_THRESHOLD = 3  # consecutive failures before flipping unhealthy
+
+
+async def health_watcher(app: FastAPI):
+    """Probe MCP via the pool every few seconds and cache the result.
+
+    Load balancers hit /health continuously; answering from a cached flag
+    avoids opening an SSE connection per probe. Debounced: only flips to
+    unhealthy after HEALTH_FAILURE_THRESHOLD consecutive failures.
+    """
+    failures = 0
+    while True:
+        try:
+            async with mcp_pool.acquire() as session:
+                await asyncio.wait_for(session.list_tools(), 2.0)
+            failures = 0
+            app.state.mcp_healthy = True
+        except Exception as e:
+            failures += 1
+            if failures >= HEALTH_FAILURE_THRESHOLD:
+                if app.state.mcp_healthy:
+                    print(f"✗ MCP unhealthy after {failures} failed probes: {e}")
+                app.state.mcp_healthy = False
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL)
+
+
+# Gemini explicit context caching: the multi-KB system prompt and the tool
+# schemas are uploaded once and referenced by cache name, so they stop being
+# resent (and re-prefilled) with every call.
+CONTEXT_CACHE_TTL_SECONDS = 3600
+CONTEXT_CACHE_REFRESH_INTERVAL = 3000.0  # recreate well before the TTL lapses
+
+
+async def _create_context_cache(app: FastAPI) -> bool:
+    """(Re)create the context cache and point gen_config at it.
+
+    Falls back to inlining the prompt when caching is unavailable (e.g. the
+    content is below the model's cacheable minimum).
+    """
+    try:
+        cache = await gemini_client.aio.caches.create(
+            model=MODEL_NAME,
+            config=types.CreateCachedContentConfig(
+                system_instruction=SYSTEM_INSTRUCTION,
+                tools=app.state.gemini_tools,
+                ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s",
+            ),
+        )
+        app.state.gen_config = types.GenerateContentConfig(
+            cached_content=cache.name,
+            max_output_tokens=8192,
+        )
+        print(f"✓ Gemini context cache active: {cache.name}")
+        return True
+    except Exception as e:
+        print(f"✗ Context caching unavailable ({e}); sending the prompt inline.")
+        # Never leave gen_config pointing at a cache that may be about to
+        # expire — a failed refresh would otherwise 500 every chat until the
+        # next attempt. Fall back to the inline prompt immediately.
+        app.state.gen_config = types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            tools=app.state.gemini_tools,
+            max_output_tokens=8192,
+        )
+        return False
+
+
+async def context_cache_refresher(app: FastAPI):
+    """Recreate the context cache periodically so it never expires mid-request."""
+    while True:
+        await asyncio.sleep(CONTEXT_CACHE_REFRESH_INTERVAL)
+        for attempt in range(1, 4):
+            if await _create_context_cache(app):
+                break
+            # Inline fallback is already active; retry with jittered backoff
+            # before settling in for the full interval
+            delay = min(60.0, 2.0 * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            await asyncio.sleep(delay)
+        # Warm chat objects captured the previous config — and its cache
+        # name — at chats.create time. Flush them so no session keeps
+        # referencing a cache that is about to expire; they rebuild from
+        # the persisted histories on their next turn.
+        chat_sessions_cache.clear()
+
+
 async def load_gemini_tools():
     """Connect to MCP server once at startup to load tool definitions."""
     async with get_mcp_session() as session:
@@ -49,13 +298,31 @@ async def load_gemini_tools():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles Gemini Client initialization and MCP tool discovery."""
-    global gemini_client
+    global gemini_client, redis_client, mcp_pool
 
     try:
-        # 1. Initialize Gemini Client
-        gemini_client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        # 1. Connect to Redis (optional — fall back to in-memory sessions)
+        try:
+            redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+            await redis_client.ping()
+            print(f"✓ Connected to Redis at {REDIS_URL}")
+        except Exception as e:
+            print(f"✗ Redis unavailable ({e}). Using in-memory sessions.")
+            redis_client = None
+
+        # 2. Initialize Gemini Client on an HTTP/2 pool so TLS handshakes
+        # amortize across requests and concurrent calls multiplex
+        gemini_client = genai.Client(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            http_options=types.HttpOptions(
+                async_client_args={
+                    "http2": True,
+                    "limits": httpx.Limits(max_keepalive_connections=50, max_connections=200),
+                }
+            ),
+        )
 
-        # 2. Load tool definitions from MCP server (one-time discovery)
+        # 3. Load tool definitions from MCP server (one-time discovery)
         max_retries = 5
         for attempt in range(1, max_retries + 1):
             try:
@@ -65,26 +332,401 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 print(f"✗ Attempt {attempt} failed: {e}")
                 if attempt < max_retries:
-                    delay = 2.0 * attempt
-                    print(f"  Retrying in {delay}s...")
+                    # Exponential backoff with jitter so a fleet of cold-started
+                    # instances doesn't hammer the MCP server in lockstep
+                    delay = min(60.0, 2.0 * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                    print(f"  Retrying in {delay:.1f}s...")
                     await asyncio.sleep(delay)
                 else:
                     raise RuntimeError(f"Failed to load MCP tools after {max_retries} attempts")
 
+        # 4. Build the generation config once — the multi-KB system prompt and
+        # tool schemas get Pydantic-validated a single time, not per request
+        app.state.gen_config = types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            tools=app.state.gemini_tools,
+            max_output_tokens=8192,
+        )
+        # Tool-free variant for internal calls (history summarization)
+        app.state.summary_config = types.GenerateContentConfig(max_output_tokens=512)
+
+        # 4b. Swap in a context-cached config when the API allows it, and keep
+        # the cache warm in the background
+        cache_task = None
+        if await _create_context_cache(app):
+            cache_task = asyncio.create_task(context_cache_refresher(app))
+
+        # 5. Prewarm the MCP session pool for request traffic
+        mcp_pool = MCPPool(REMOTE_SERVER_URL)
+        await mcp_pool.start()
+
+        # 6. Start the background MCP health probe and hot-cache refresher
+        app.state.mcp_healthy = True
+        health_task = asyncio.create_task(health_watcher(app))
+        hot_cache_task = asyncio.create_task(hot_cache_refresher())
+
         yield
 
+        health_task.cancel()
+        hot_cache_task.cancel()
+        if cache_task:
+            cache_task.cancel()
+
     except Exception as e:
         print(f"✗ Startup failed: {e}")
         raise
     finally:
+        if mcp_pool:
+            await mcp_pool.close()
+        if redis_client:
+            await redis_client.aclose()
         print("✓ Cleanup complete.")
 
 
 # --- GLOBAL STATE ---
 gemini_client: Optional[genai.Client] = None
+mcp_pool: Optional[MCPPool] = None
+
+# Session store: Redis-backed ("sess:{session_id}" -> JSON-dumped Content list, TTL
+# refresh on write) so multiple workers share history and idle sessions auto-expire.
+# Falls back to a process-local dict when Redis is unreachable (dev mode).
+# The fallback is a bounded LRU with TTL so a long-running process can't
+# leak memory across many users.
+redis_client: Optional[aioredis.Redis] = None
+user_sessions: TTLCache = TTLCache(maxsize=SESSION_CACHE_MAX, ttl=SESSION_TTL)
+
+
+async def load_session_history(session_id: str) -> List[types.Content]:
+    """Fetch a session's Gemini history, or an empty list for a new session."""
+    if redis_client:
+        raw = await redis_client.get(f"sess:{session_id}")
+        if not raw:
+            return []
+        return [types.Content.model_validate(item) for item in orjson.loads(raw)]
+    return user_sessions.get(session_id, [])
+
+
+async def save_session_history(session_id: str, history: List[types.Content]):
+    """Persist a session's Gemini history, refreshing its TTL."""
+    if redis_client:
+        payload = orjson.dumps([c.model_dump(mode="json", exclude_none=True) for c in history])
+        await redis_client.set(f"sess:{session_id}", payload, ex=SESSION_TTL)
+    else:
+        user_sessions[session_id] = history
+
+
+async def delete_session_history(session_id: str):
+    """Remove a session's history."""
+    if redis_client:
+        await redis_client.delete(f"sess:{session_id}")
+    else:
+        user_sessions.pop(session_id, None)
+
+
+# --- TOOL RESULT CACHE ---
+# General queries like get_critical_recalls(limit=5) — explicitly encouraged
+# by the system prompt — return identical data for every user within minutes.
+# A short-TTL Redis cache skips the whole MCP + FDA round-trip on hits.
+TOOL_CACHE_TTLS = {
+    "get_critical_recalls": 300,
+    "get_recent_drug_recalls": 300,
+    "get_recalls_by_classification": 300,
+    "get_current_drug_shortages": 300,
+    "get_drug_label": 86400,
+    "search_drug_labels": 86400,
+}
+DEFAULT_TOOL_CACHE_TTL = 60
+
+
+def _tool_cache_key(name: str, arguments: Optional[Dict[str, Any]]) -> str:
+    args_hash = hashlib.blake2b(
+        orjson.dumps(arguments or {}, option=orjson.OPT_SORT_KEYS, default=str), digest_size=16
+    ).hexdigest()
+    return f"tool:{name}:{args_hash}"
+
+
+def _tool_cache_ttu(key: str, value: str, now: float) -> float:
+    # Keys look like "tool:{name}:{hash}"; expire per the tool's TTL
+    name = key.split(":", 2)[1]
+    return now + TOOL_CACHE_TTLS.get(name, DEFAULT_TOOL_CACHE_TTL)
+
+
+# In-process fallback tier used when Redis is unreachable, with the same
+# per-tool TTLs (TLRU = LRU eviction + per-item expiry)
+_tool_cache_local: TLRUCache = TLRUCache(maxsize=512, ttu=_tool_cache_ttu)
+
+
+# In-flight identical tool calls are coalesced into one awaitable, so two
+# users asking "show me recent recalls" in the same second produce a single
+# upstream call (and the leader populates the Redis cache for both).
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+async def cached_call_tool(session: ClientSession, name: str, arguments: Optional[Dict[str, Any]]) -> str:
+    """Execute an MCP tool and return its text output, via the Redis cache.
+
+    Concurrent identical calls are deduplicated: followers await the task
+    started by the first caller instead of hitting the MCP server again.
+    """
+    key = _tool_cache_key(name, arguments)
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_call_tool_uncoalesced(session, name, arguments, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _t, _k=key: _inflight.pop(_k, None))
+    return await task
+
+
+def _extract_tool_text(result) -> str:
+    # Skip the join entirely on the common single-block case
+    texts = [c.text for c in result.content if c.type == "text"]
+    return texts[0] if len(texts) == 1 else "\n".join(texts)
+
+
+async def _store_tool_result(name: str, key: str, tool_output: str):
+    # Don't cache failures (the server reports them as "Error ..." strings) —
+    # a transient timeout would otherwise be served for the full tool TTL
+    if tool_output.startswith("Error"):
+        return
+    if redis_client:
+        ttl = TOOL_CACHE_TTLS.get(name, DEFAULT_TOOL_CACHE_TTL)
+        await redis_client.setex(key, ttl, tool_output)
+    else:
+        _tool_cache_local[key] = tool_output
+
+
+async def _call_tool_uncoalesced(session: ClientSession, name: str, arguments: Optional[Dict[str, Any]], key: str) -> str:
+    if redis_client:
+        cached = await redis_client.get(key)
+    else:
+        cached = _tool_cache_local.get(key)
+    if cached is not None:
+        return cached
+
+    result = await session.call_tool(name=name, arguments=arguments)
+    tool_output = _extract_tool_text(result)
+    await _store_tool_result(name, key, tool_output)
+    return tool_output
+
+
+# --- HOT CACHE ---
+# The system prompt steers every "any recalls?" / "any shortages?" question
+# to these exact calls; a background task keeps their cache entries warm so
+# the most common queries never wait on the MCP + FDA round trip.
+HOT_TOOL_CALLS = (
+    ("get_critical_recalls", {"limit": 5}),
+    ("get_current_drug_shortages", {"limit": 5}),
+)
+HOT_CACHE_REFRESH_INTERVAL = 60.0
+
+
+async def _refresh_hot_entry(session: ClientSession, name: str, arguments: Dict[str, Any]):
+    # Bypass the cache read so the entry is overwritten while still fresh
+    result = await session.call_tool(name=name, arguments=arguments)
+    await _store_tool_result(name, _tool_cache_key(name, arguments), _extract_tool_text(result))
+
+
+async def hot_cache_refresher():
+    """Refresh the hot tool-call cache entries on a fixed interval."""
+    while True:
+        try:
+            async with mcp_pool.acquire() as session:
+                await asyncio.gather(
+                    *[_refresh_hot_entry(session, name, dict(args)) for name, args in HOT_TOOL_CALLS]
+                )
+        except Exception as e:
+            print(f"✗ Hot cache refresh failed: {e}")
+        await asyncio.sleep(HOT_CACHE_REFRESH_INTERVAL)
+
+
+def shrink_tool_output(s: str, max_chars: int = 4000) -> str:
+    """
+    Bound how much tool output enters the LLM context. FDA endpoints can
+    return tens of KB per call and everything appended to history is resent
+    on subsequent turns. Keeps the head (structured JSON carries its most
+    useful fields first) plus a short tail.
+    """
+    # Tool results are pretty-printed JSON; re-encoding compact drops the
+    # indentation (often a third of the payload) before any truncation
+    if s[:1] in ("{", "["):
+        try:
+            s = orjson.dumps(orjson.loads(s)).decode()
+        except orjson.JSONDecodeError:
+            pass
+    if len(s) <= max_chars:
+        return s
+    truncated = len(s) - 3800
+    return s[:3000] + f"\n...[truncated {truncated} chars]...\n" + s[-800:]
+
+
+def _trim_history(history: List[types.Content], k_user_turns: int = 6) -> List[types.Content]:
+    """
+    Keep only the most recent k_user_turns user turns when seeding a chat
+    session, so long conversations don't resend (and re-tokenize) the whole
+    transcript every turn. The window always starts at a plain-text user
+    message so a function_call/function_response pair is never split.
+    """
+    # A leading rolling summary (see _summarize_history) is always kept
+    head = history[:1] if history and _is_summary_content(history[0]) else []
+    tail = history[len(head):]
+
+    user_turns = 0
+    start = 0
+    for i in range(len(tail) - 1, -1, -1):
+        content = tail[i]
+        parts = content.parts or []
+        if content.role == "user" and not any(p.function_response for p in parts):
+            user_turns += 1
+            if user_turns >= k_user_turns:
+                start = i
+                break
+    return head + tail[start:]
+
+
+# --- ROLLING SUMMARIZATION ---
+# Pure truncation forgets early instructions (drug names, patient context).
+# Once a history gets long, compress the oldest turns into one summary
+# Content so that context survives at a fixed token cost.
+SUMMARY_THRESHOLD = 30  # summarize once history exceeds this many Contents
+SUMMARY_BATCH = 14      # how many of the oldest Contents to compress
+
+_SUMMARY_PREFIX = "Prior conversation summary: "
+
+# Bounded + TTL'd like user_sessions (session ids are client-supplied)
+_summary_locks: TTLCache = TTLCache(maxsize=SESSION_CACHE_MAX, ttl=SESSION_TTL)
+
+
+def _is_summary_content(content: types.Content) -> bool:
+    parts = content.parts or []
+    return (
+        content.role == "user"
+        and bool(parts)
+        and (parts[0].text or "").startswith(_SUMMARY_PREFIX)
+    )
+
+
+def _content_to_text(content: types.Content) -> str:
+    text = " ".join(p.text for p in (content.parts or []) if p.text)
+    return f"{content.role}: {text}" if text else ""
+
+
+async def _summarize_history(
+    session_id: str, history: List[types.Content], force: bool = False
+) -> List[types.Content]:
+    """Compress the oldest turns into a single summary Content.
+
+    With force=True (explicit compaction) everything but the last few turns
+    is summarized regardless of the threshold.
+    """
+    if not force and len(history) <= SUMMARY_THRESHOLD:
+        return history
+
+    # Per-session lock so two concurrent requests don't double-summarize
+    lock = _summary_locks.get(session_id) or asyncio.Lock()
+    _summary_locks[session_id] = lock
+    async with lock:
+        if not force and len(history) <= SUMMARY_THRESHOLD:
+            return history
+
+        # Cut on a plain user message so a function_call/response pair isn't split
+        cut = max(1, len(history) - 6) if force else SUMMARY_BATCH
+        while cut < len(history):
+            content = history[cut]
+            parts = content.parts or []
+            if content.role == "user" and not any(p.function_response for p in parts):
+                break
+            cut += 1
+
+        old = history[:cut]
+        dump = "\n".join(filter(None, (_content_to_text(c) for c in old)))
+
+        try:
+            resp = await gemini_call(lambda: gemini_client.aio.models.generate_content(
+                model=MODEL_NAME,
+                contents="Summarize this conversation excerpt briefly, keeping "
+                         "drug names, recall details, and user context:\n" + dump,
+                config=app.state.summary_config,
+            ))
+            summary = resp.text or ""
+        except Exception as e:
+            # Summarization is best-effort; keep the full history on failure
+            logger.warning("History summarization failed: %s", e)
+            return history
+
+        summary_content = types.Content(
+            role="user", parts=[types.Part(text=_SUMMARY_PREFIX + summary)]
+        )
+        return [summary_content] + history[cut:]
+
+# Explicit topic switches ("new topic: ...") drop the accumulated context
+# server-side: shorter prompts, better prefix-cache hits, no stale drug
+# context bleeding into the new question.
+_NEW_TOPIC_RE = re.compile(r"^\s*(?:new topic|new question|start over|reset)\b[:,]?\s*", re.IGNORECASE)
+
+
+async def _maybe_reset_session(session_id: str, message: str) -> str:
+    """If the message starts with a topic-switch marker, wipe the session's
+    history and return the message with the marker stripped."""
+    m = _NEW_TOPIC_RE.match(message)
+    if not m:
+        return message
+    chat_sessions_cache.pop(session_id, None)
+    await delete_session_history(session_id)
+    return message[m.end():] or message
+
+
+# --- RESPONSE CACHE ---
+# Identical first-turn questions ("any recalls?", "current shortages?")
+# dominate traffic and are session-independent, so an exact-match cache on
+# the normalized message skips the entire Gemini + tool round trip. Only
+# consulted for turns with no prior history, where the answer can't depend
+# on conversation context.
+RESPONSE_CACHE_TTL = 300  # tool-backed answers go stale with the FDA feeds
+response_cache: TTLCache = TTLCache(maxsize=2048, ttl=RESPONSE_CACHE_TTL)
+
+
+def _response_cache_key(message: str) -> str:
+    return hashlib.sha256(message.lower().strip().encode()).hexdigest()
+
+
+# Warm Gemini chat objects keyed by session_id. chats.create re-validates
+# the entire history through Pydantic on every call; for warm sessions we
+# reuse the live object and only rebuild from the persisted history after
+# eviction or restart.
+chat_sessions_cache: TTLCache = TTLCache(maxsize=5000, ttl=1800)
+
+
+async def get_chat_session(session_id: str):
+    """Return the cached chat object for a session, creating it if needed."""
+    chat_session = chat_sessions_cache.get(session_id)
+    if chat_session is None:
+        chat_session = gemini_client.aio.chats.create(
+            model=MODEL_NAME,
+            history=_trim_history(await load_session_history(session_id)),
+            config=app.state.gen_config
+        )
+        chat_sessions_cache[session_id] = chat_session
+    return chat_session
+
+
+# --- PER-SESSION LOCKS ---
+# Two concurrent requests for the same session race on load/save of the
+# shared history, producing interleaved or duplicated turns. One lock per
+# session serializes them.
+# Bounded like user_sessions: session ids are client-supplied, so a plain
+# dict would grow without limit. Re-inserting on access refreshes the TTL,
+# so a lock only expires after the same idle period as its session.
+session_locks: TTLCache = TTLCache(maxsize=SESSION_CACHE_MAX, ttl=SESSION_TTL)
+_locks_guard = asyncio.Lock()
+
+
+async def get_session_lock(session_id: str) -> asyncio.Lock:
+    async with _locks_guard:
+        lock = session_locks.get(session_id) or asyncio.Lock()
+        session_locks[session_id] = lock
+        return lock
 
-# Simple in-memory session store: { "session_id": [messages_list] }
-user_sessions: Dict[str, List[types.Content]] = {}
 
 SYSTEM_INSTRUCTION = """You are a pharmaceutical assistant with access to FDA drug databases. Your job is to provide clear, actionable safety information using real FDA data.
 
@@ -120,6 +762,7 @@ SYSTEM_INSTRUCTION = """You are a pharmaceutical assistant with access to FDA dr
 5. TOOL PROTOCOL:
 - Maximum 2 tool calls per message.
 - Use `search_recalls` if a drug name is provided.
+- For a combined safety check on one drug (shortage + recall status), call `get_drug_overview(drug_name)` once instead of separate shortage and recall calls.
 - If a search for a common drug (e.g., Tylenol) returns a distributor recall, clarify that it may not affect all brands/bottles.
 
 ### RESPONSE FORMAT
@@ -171,22 +814,42 @@ Assistant: "According to the FDA Recall Database, here are the most recent Class
 Would you like more details on any of these recalls?"
 """
 
-def convert_mcp_to_gemini_tools(mcp_tools) -> List[types.Tool]:
-    """Convert MCP tool schemas to Gemini FunctionDeclaration format."""
+def convert_mcp_to_gemini_tools(mcp_tools) -> tuple[types.Tool, ...]:
+    """
+    Convert MCP tool schemas to Gemini FunctionDeclaration format.
+
+    Runs exactly once at startup; the returned tuple is immutable and reused
+    by reference on every request, so nothing re-validates or mutates it.
+    """
     function_declarations = []
     for tool in mcp_tools.tools:
         func_decl = types.FunctionDeclaration(
             name=tool.name,
-            description=tool.description,
+            # Descriptions are resent with every Gemini call; collapse the
+            # docstring whitespace and cap the length to keep payloads small
+            description=textwrap.shorten(tool.description or "", width=240, placeholder=" ..."),
             parameters_json_schema=tool.inputSchema
         )
         function_declarations.append(func_decl)
-    return [types.Tool(function_declarations=function_declarations)]
+    return (types.Tool(function_declarations=function_declarations),)
+
+
+
 
 
 
+class _NonStreamingGZipMiddleware(GZipMiddleware):
+    """GZip for JSON endpoints only — compressing the SSE stream breaks
+    incremental delivery through some proxies, so /chat/stream is skipped."""
 
-app = FastAPI(title="OpenFDA Pharmaceutical Assistant", lifespan=lifespan)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app = FastAPI(title="OpenFDA Pharmaceutical Assistant", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -197,12 +860,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# FDA tool-result JSON regularly exceeds 20KB; compress anything over 1KB
+app.add_middleware(_NonStreamingGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 # --- DATA MODELS ---
 
 class ChatRequest(BaseModel):
     message: str
-    session_id: Optional[str] = None
+    # Bounded so arbitrary client input can't become an oversized store key
+    session_id: Optional[str] = Field(default=None, max_length=64)
 
 
 class ToolExecutionLog(BaseModel):
@@ -223,84 +890,118 @@ class ChatResponse(BaseModel):
 async def chat(request: ChatRequest):
     """
     Main chat endpoint for pharmaceutical queries.
-    Opens a fresh MCP connection per request to avoid stale SSE connections.
+    Tool calls run on a pooled MCP session to skip the per-request SSE handshake.
     """
     if not gemini_client:
         raise HTTPException(status_code=503, detail="Gemini client not initialized")
 
-    session_id = request.session_id or str(uuid.uuid4())
+    session_id = request.session_id or secrets.token_urlsafe(16)
     executed_tools = []
 
+    # Fresh sessions with a cached answer skip Gemini entirely
+    is_first_turn = request.session_id is None
+    if is_first_turn:
+        cached = response_cache.get(_response_cache_key(request.message))
+        if cached is not None:
+            # Seed the new session's history so follow-ups have context
+            await save_session_history(session_id, [
+                types.Content(role="user", parts=[types.Part(text=request.message)]),
+                types.Content(role="model", parts=[types.Part(text=cached)]),
+            ])
+            return ChatResponse(response=cached, session_id=session_id)
+
+    # Serialize concurrent requests for the same session
+    lock = await get_session_lock(session_id)
+    await lock.acquire()
     try:
-        # Create Gemini chat session
-        chat_session = gemini_client.aio.chats.create(
-            model=MODEL_NAME,
-            history=user_sessions.get(session_id, []),
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_INSTRUCTION,
-                tools=app.state.gemini_tools,
-                max_output_tokens=8192,
-            )
-        )
+        # An explicit "new topic" marker wipes the session before this turn
+        message = await _maybe_reset_session(session_id, request.message)
+
+        # Reuse the warm Gemini chat session when we have one
+        chat_session = await get_chat_session(session_id)
 
         # Send user message
-        response = await chat_session.send_message(request.message)
+        response = await gemini_call(lambda: chat_session.send_message(message))
 
         # Tool execution loop — open a fresh MCP connection only if tools are needed
         max_turns = 10
-        if response.function_calls:
-            async with get_mcp_session() as mcp_session:
+        # The SDK accessor rebuilds this list from candidate parts each time;
+        # grab it once per turn
+        function_calls = response.function_calls or ()
+        if function_calls:
+            async with mcp_pool.acquire() as mcp_session:
                 for turn in range(max_turns):
-                    if not response.function_calls:
+                    if not function_calls:
                         break
 
-                    tool_responses = []
-                    for fc in response.function_calls:
-                        print(f"[Turn {turn+1}] Calling: {fc.name}({fc.args})")
-                        try:
-                            result = await mcp_session.call_tool(name=fc.name, arguments=fc.args)
+                    for fc in function_calls:
+                        logger.debug("[turn %d] calling %s(%s)", turn + 1, fc.name, fc.args)
 
-                            tool_output = "\n".join(
-                                [c.text for c in result.content if c.type == "text"]
-                            )
-
-                            executed_tools.append(ToolExecutionLog(
-                                name=fc.name,
-                                arguments=fc.args,
-                                output=tool_output[:500]
-                            ))
+                    # Dispatch all function calls concurrently — parallel calls
+                    # from the model shouldn't serialize on the wire
+                    results = await asyncio.gather(
+                        *[cached_call_tool(mcp_session, fc.name, fc.args)
+                          for fc in function_calls],
+                        return_exceptions=True
+                    )
 
+                    tool_responses = []
+                    for fc, outcome in zip(function_calls, results):
+                        if isinstance(outcome, BaseException):
+                            logger.warning("Tool call %s failed: %s", fc.name, outcome)
                             tool_responses.append(
                                 types.Part.from_function_response(
                                     name=fc.name,
-                                    response={"result": tool_output}
+                                    response={"error": str(outcome)}
                                 )
                             )
+                            continue
 
-                        except Exception as e:
-                            print(f"  Error calling {fc.name}: {e}")
-                            tool_responses.append(
-                                types.Part.from_function_response(
-                                    name=fc.name,
-                                    response={"error": str(e)}
-                                )
+                        tool_output = outcome
+
+                        executed_tools.append(ToolExecutionLog.model_construct(
+                            name=fc.name,
+                            arguments=fc.args,
+                            output=tool_output[:500]
+                        ))
+
+                        tool_responses.append(
+                            types.Part.from_function_response(
+                                name=fc.name,
+                                response={"result": shrink_tool_output(tool_output)}
                             )
+                        )
 
                     # Continue conversation with tool results
-                    response = await chat_session.send_message(tool_responses)
-
-        # Save history
-        user_sessions[session_id] = chat_session.get_history()
+                    response = await gemini_call(
+                        lambda tr=tool_responses: chat_session.send_message(tr)
+                    )
+                    function_calls = response.function_calls or ()
+
+        # Save history (summarize-and-evict the oldest turns once it gets long)
+        history = chat_session.get_history()
+        compacted = await _summarize_history(session_id, history)
+        await save_session_history(session_id, compacted)
+        if len(compacted) < len(history):
+            # Drop the warm chat object: it still holds the full history and
+            # would keep resending it, ignoring the compaction we just saved
+            chat_sessions_cache.pop(session_id, None)
+
+        bot_response = response.text or "I couldn't provide an answer."
+        if is_first_turn and response.text:
+            response_cache[_response_cache_key(request.message)] = bot_response
 
         return ChatResponse(
-            response=response.text or "I couldn't provide an answer.",
+            response=bot_response,
             session_id=session_id,
             tools_used=executed_tools if executed_tools else None
         )
 
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Chat error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        lock.release()
 
 
 @app.post("/chat/stream")
@@ -318,25 +1019,24 @@ async def chat_stream(request: ChatRequest):
     if not gemini_client:
         raise HTTPException(status_code=503, detail="Gemini client not initialized")
 
-    session_id = request.session_id or str(uuid.uuid4())
+    session_id = request.session_id or secrets.token_urlsafe(16)
 
     async def event_generator():
         executed_tools = []
         mcp_session_ctx = None
         mcp_session = None
+        loop = asyncio.get_running_loop()
 
+        # Serialize concurrent requests for the same session
+        lock = await get_session_lock(session_id)
+        await lock.acquire()
         try:
-            chat_session = gemini_client.aio.chats.create(
-                model=MODEL_NAME,
-                history=user_sessions.get(session_id, []),
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_INSTRUCTION,
-                    tools=app.state.gemini_tools,
-                    max_output_tokens=8192,
-                )
-            )
+            # An explicit "new topic" marker wipes the session before this turn
+            message_input = await _maybe_reset_session(session_id, request.message)
+
+            # Reuse the warm Gemini chat session when we have one
+            chat_session = await get_chat_session(session_id)
 
-            message_input = request.message
             max_turns = 10
 
             for turn in range(max_turns):
@@ -344,74 +1044,101 @@ async def chat_stream(request: ChatRequest):
                 has_text = False
                 has_function_calls = False
 
-                stream = await chat_session.send_message_stream(message_input)
+                # Micro-batch text deltas: Gemini emits 1-3 tokens per chunk,
+                # and one JSON encode + flush per chunk is CPU/syscall-bound
+                # at high token rates. Coalesce up to SSE_BATCH_SIZE deltas
+                # or SSE_BATCH_INTERVAL seconds per event.
+                buf = []
+                deadline = loop.time() + SSE_BATCH_INTERVAL
+
+                stream = await gemini_call(
+                    lambda mi=message_input: chat_session.send_message_stream(mi)
+                )
                 async for chunk in stream:
                     if chunk.text:
                         has_text = True
-                        yield ServerSentEvent(
-                            data=json.dumps({"text": chunk.text}),
-                            event="text_delta"
-                        )
+                        buf.append(chunk.text)
+                        now = loop.time()
+                        if len(buf) >= SSE_BATCH_SIZE or now >= deadline:
+                            yield ServerSentEvent(
+                                data=orjson.dumps({"text": "".join(buf)}).decode(),
+                                event="text_delta"
+                            )
+                            buf.clear()
+                            deadline = now + SSE_BATCH_INTERVAL
 
                     if chunk.function_calls:
                         has_function_calls = True
                         function_calls_this_turn.extend(chunk.function_calls)
 
+                # Flush any buffered text before tool events or turn end,
+                # preserving event ordering guarantees
+                if buf:
+                    yield ServerSentEvent(
+                        data=orjson.dumps({"text": "".join(buf)}).decode(),
+                        event="text_delta"
+                    )
+
                 # Pure text response — streaming is done
                 if has_text and not has_function_calls:
                     break
 
                 if has_function_calls:
-                    # Open MCP session lazily (once per request)
+                    # Acquire a pooled MCP session lazily (once per request)
                     if mcp_session is None:
-                        mcp_session_ctx = get_mcp_session()
+                        mcp_session_ctx = mcp_pool.acquire()
                         mcp_session = await mcp_session_ctx.__aenter__()
 
-                    tool_responses = []
                     for fc in function_calls_this_turn:
-                        print(f"[Stream Turn {turn+1}] Calling: {fc.name}({fc.args})")
-
+                        logger.debug("[stream turn %d] calling %s(%s)", turn + 1, fc.name, fc.args)
                         yield ServerSentEvent(
-                            data=json.dumps({"tool_name": fc.name, "tool_args": fc.args}),
+                            data=orjson.dumps({"tool_name": fc.name, "tool_args": fc.args}).decode(),
                             event="tool_start"
                         )
 
-                        try:
-                            result = await mcp_session.call_tool(name=fc.name, arguments=fc.args)
-                            tool_output = "\n".join(
-                                [c.text for c in result.content if c.type == "text"]
-                            )
-
-                            executed_tools.append(ToolExecutionLog(
-                                name=fc.name,
-                                arguments=fc.args,
-                                output=tool_output[:500]
-                            ))
+                    # Dispatch all function calls concurrently — parallel calls
+                    # from the model shouldn't serialize on the wire
+                    results = await asyncio.gather(
+                        *[cached_call_tool(mcp_session, fc.name, fc.args)
+                          for fc in function_calls_this_turn],
+                        return_exceptions=True
+                    )
 
+                    tool_responses = []
+                    for fc, outcome in zip(function_calls_this_turn, results):
+                        if isinstance(outcome, BaseException):
+                            logger.warning("Tool call %s failed: %s", fc.name, outcome)
                             tool_responses.append(
                                 types.Part.from_function_response(
                                     name=fc.name,
-                                    response={"result": tool_output}
+                                    response={"error": str(outcome)}
                                 )
                             )
-
                             yield ServerSentEvent(
-                                data=json.dumps({"tool_name": fc.name, "success": True}),
+                                data=orjson.dumps({"tool_name": fc.name, "success": False, "error": str(outcome)}).decode(),
                                 event="tool_end"
                             )
+                            continue
 
-                        except Exception as e:
-                            print(f"  Error calling {fc.name}: {e}")
-                            tool_responses.append(
-                                types.Part.from_function_response(
-                                    name=fc.name,
-                                    response={"error": str(e)}
-                                )
-                            )
-                            yield ServerSentEvent(
-                                data=json.dumps({"tool_name": fc.name, "success": False, "error": str(e)}),
-                                event="tool_end"
+                        tool_output = outcome
+
+                        executed_tools.append(ToolExecutionLog.model_construct(
+                            name=fc.name,
+                            arguments=fc.args,
+                            output=tool_output[:500]
+                        ))
+
+                        tool_responses.append(
+                            types.Part.from_function_response(
+                                name=fc.name,
+                                response={"result": shrink_tool_output(tool_output)}
                             )
+                        )
+
+                        yield ServerSentEvent(
+                            data=orjson.dumps({"tool_name": fc.name, "success": True}).decode(),
+                            event="tool_end"
+                        )
 
                     # Feed tool results back to Gemini for the next turn
                     message_input = tool_responses
@@ -419,24 +1146,31 @@ async def chat_stream(request: ChatRequest):
                     # No text and no function calls — empty response
                     break
 
-            # Save session history
-            user_sessions[session_id] = chat_session.get_history()
+            # Save session history (summarize-and-evict the oldest turns once it gets long)
+            history = chat_session.get_history()
+            compacted = await _summarize_history(session_id, history)
+            await save_session_history(session_id, compacted)
+            if len(compacted) < len(history):
+                # Drop the warm chat object: it still holds the full history
+                # and would keep resending it, ignoring the saved compaction
+                chat_sessions_cache.pop(session_id, None)
 
             yield ServerSentEvent(
-                data=json.dumps({
+                data=orjson.dumps({
                     "session_id": session_id,
                     "tools_used": [t.model_dump() for t in executed_tools] if executed_tools else None
-                }),
+                }).decode(),
                 event="done"
             )
 
         except Exception as e:
-            print(f"Streaming error: {e}")
+            logger.error("Streaming error: %s", e)
             yield ServerSentEvent(
-                data=json.dumps({"message": str(e)}),
+                data=orjson.dumps({"message": str(e)}).decode(),
                 event="error"
             )
         finally:
+            lock.release()
             if mcp_session_ctx is not None:
                 try:
                     await mcp_session_ctx.__aexit__(None, None, None)
@@ -453,22 +1187,36 @@ async def chat_stream(request: ChatRequest):
     )
 
 
+@app.post("/session/{session_id}/compact")
+async def compact_session(session_id: str):
+    """Summarize everything but the session's last few turns into one
+    message, shrinking what every subsequent turn resends to Gemini."""
+    lock = await get_session_lock(session_id)
+    async with lock:
+        history = await load_session_history(session_id)
+        if not history:
+            raise HTTPException(status_code=404, detail="Session not found")
+        before = len(history)
+        compacted = await _summarize_history(session_id, history, force=True)
+        await save_session_history(session_id, compacted)
+        # Drop the warm chat object so it rebuilds from the compacted history
+        chat_sessions_cache.pop(session_id, None)
+    return {"status": "success", "messages_before": before, "messages_after": len(compacted)}
+
+
 @app.delete("/session/{session_id}")
 async def clear_session(session_id: str):
     """Clear conversation history."""
-    user_sessions.pop(session_id, None)
+    chat_sessions_cache.pop(session_id, None)
+    session_locks.pop(session_id, None)
+    await delete_session_history(session_id)
     return {"status": "success"}
 
 
 @app.get("/health")
 async def health():
-    """Health check — verifies Gemini client and MCP server reachability."""
-    mcp_ok = False
-    try:
-        async with get_mcp_session() as session:
-            mcp_ok = True
-    except Exception:
-        pass
+    """Health check — serves the MCP status cached by the background watcher."""
+    mcp_ok = bool(getattr(app.state, "mcp_healthy", False))
     return {
         "status": "healthy" if (mcp_ok and gemini_client) else "degraded",
         "mcp": mcp_ok,
@@ -1,3 +1,4 @@
 #!/bin/bash
 source .venv/bin/activate
-uvicorn client:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+uvicorn client:app --host 0.0.0.0 --port $PORT \
+    --loop uvloop --http httptools --workers ${UVICORN_WORKERS:-1} --no-access-log
\ No newline at end of file
@@ -8,12 +8,16 @@ Uses correct API field names based on actual openFDA endpoints:
 - Drug Shortages: dosage_form, update_type (simpler endpoint)
 """
 
+import asyncio
+import logging
 import os
 import httpx
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional, Dict, Any
-import json
 
 load_dotenv()
 
@@ -21,164 +25,239 @@ BASE_URL = "https://api.fda.gov"
 TIMEOUT = 10.0
 API_KEY = os.getenv("OPENFDA_DRUG_API_KEY")
 
+# Endpoint paths, relative to the shared client's base_url. Pre-parsed
+# httpx.URL objects so each request merges a ready-made URL instead of
+# re-parsing a string.
+EVENT_URL = httpx.URL("/drug/event.json")
+LABEL_URL = httpx.URL("/drug/label.json")
+ENFORCEMENT_URL = httpx.URL("/drug/enforcement.json")
+SHORTAGES_URL = httpx.URL("/drug/shortages.json")
+
+# Lazy %-style logging instead of print: no f-string formatting or stdout
+# write happens on the hot path unless the level is actually enabled.
+logger = logging.getLogger("openfda")
+
+# Shared HTTP client: one HTTP/2 connection pool for every FDA request, so
+# back-to-back tool calls reuse warm TLS sessions instead of paying a fresh
+# TCP + TLS handshake each time. Created lazily on first use (needs a
+# running event loop).
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            http2=True,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_keepalive_connections=50,
+                max_connections=100,
+                keepalive_expiry=30.0,
+            ),
+            # Advertise brotli alongside gzip — FDA JSON is highly
+            # repetitive and compresses 4-10x, cutting bytes on the wire
+            headers={
+                "accept-encoding": "gzip, br",
+                "user-agent": "mcp-openfda/1.0",
+            },
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared client (called on server shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Short-TTL response cache: a chat turn (or two users in the same window)
+# often re-queries the same label or recall endpoint, and FDA data changes
+# on human timescales. Date-ranged queries already use day-granularity
+# strings, so their keys stay stable all day. Failures are never cached.
+FDA_CACHE_TTL = 300
+_response_cache: TTLCache = TTLCache(maxsize=256, ttl=FDA_CACHE_TTL)
+
+# openFDA enforces a per-key request quota; cap in-flight requests and back
+# off on 429s instead of surfacing hard failures to the tools.
+FDA_MAX_CONCURRENCY = int(os.getenv("FDA_MAX_CONCURRENCY", "30"))
+FDA_MAX_RETRIES = 4
+_fda_sem: Optional[asyncio.Semaphore] = None
+
+
+def _get_fda_sem() -> asyncio.Semaphore:
+    global _fda_sem
+    if _fda_sem is None:
+        _fda_sem = asyncio.Semaphore(FDA_MAX_CONCURRENCY)
+    return _fda_sem
+
 
 # ============================================================================
 # FILTER FUNCTIONS - ENDPOINT-SPECIFIC OPTIMIZATION
 # ============================================================================
 
+# Seriousness flags as (API field, label) pairs so the filter below builds
+# the list in one comprehension instead of four ifs per report
+# Valid recall classifications: frozenset for O(1) membership with no
+# per-call list rebuild, plus the error message built once
+_VALID_CLASSES = frozenset({"Class I", "Class II", "Class III"})
+_INVALID_CLASS_ERROR = (
+    "Invalid classification. Must be one of: ['Class I', 'Class II', 'Class III']"
+)
+
+_SERIOUSNESS_FLAGS = (
+    ("seriousnessdeathcoding", "Death"),
+    ("seriousnesslifethreatening", "Life Threatening"),
+    ("seriousnesshospitalization", "Hospitalization"),
+    ("seriousnessdisabling", "Disabling"),
+)
+
+
+def _get_first(field_value, default="Not specified"):
+    """Return the first entry of an openFDA list-or-string field, capped at 500 chars."""
+    if isinstance(field_value, list) and field_value:
+        val = field_value[0]
+        return val[:500] if isinstance(val, str) and len(val) > 500 else val
+    elif isinstance(field_value, str):
+        return field_value[:500]
+    return default
+
+
 def filter_adverse_events_data(results: list) -> list:
     """
     Extract LLM-relevant fields from adverse events API response.
+
+    Hot path for 50-100 item responses: nested dicts are pulled out once
+    and .get is bound locally, so each report is a single cheap pass.
     """
     clean_data = []
-    
+
     for item in results:
-        patient = item.get("patient", {})
-        
+        get = item.get
+        patient = get("patient") or {}
+
         # Extract reactions with outcomes (limit to 3)
-        reactions = []
-        for reaction in patient.get("reaction", [])[:3]:
-            reactions.append({
-                "meddra_term": reaction.get("reactionmeddrapt", "Unknown"),
-                "outcome": reaction.get("reactionoutcome", "Unknown")
-            })
-        
+        reactions = [{
+            "meddra_term": r.get("reactionmeddrapt", "Unknown"),
+            "outcome": r.get("reactionoutcome", "Unknown")
+        } for r in (patient.get("reaction") or [])[:3]]
+
         # Extract drugs with key details (limit to 2)
         drugs = []
-        for drug in patient.get("drug", [])[:2]:
-            active_substance = drug.get("activesubstance", {})
-            substance_name = (
-                active_substance.get("activesubstancename", "Unknown") 
-                if isinstance(active_substance, dict) else "Unknown"
-            )
-            
-            # Get openfda data if available
-            openfda = drug.get("openfda", {})
-            
+        for drug in (patient.get("drug") or [])[:2]:
+            active_substance = drug.get("activesubstance")
+            pharm_class = (drug.get("openfda") or {}).get("pharm_class_epc")
+
             drugs.append({
                 "product_name": drug.get("drugname", "Unknown"),
-                "active_substance": substance_name,
+                "active_substance": (
+                    active_substance.get("activesubstancename", "Unknown")
+                    if isinstance(active_substance, dict) else "Unknown"
+                ),
                 "route": drug.get("drugadministrationroute", "Unknown"),
                 "indication": drug.get("drugindication", "Unknown"),
-                "pharm_class": openfda.get("pharm_class_epc", ["Unknown"])[0] if openfda.get("pharm_class_epc") else "Unknown"
+                "pharm_class": pharm_class[0] if pharm_class else "Unknown"
             })
-        
-        # Extract seriousness indicators
-        seriousness_types = []
-        if item.get("seriousnessdeathcoding") == "1":
-            seriousness_types.append("Death")
-        if item.get("seriousnesslifethreatening") == "1":
-            seriousness_types.append("Life Threatening")
-        if item.get("seriousnesshospitalization") == "1":
-            seriousness_types.append("Hospitalization")
-        if item.get("seriousnessdisabling") == "1":
-            seriousness_types.append("Disabling")
-        
-        entry = {
-            "report_id": item.get("safetyreportid"),
-            "received_date": item.get("receivedate"),  # CORRECTED field name
-            "is_serious": item.get("serious") == "1",
-            "seriousness_types": seriousness_types,
+
+        clean_data.append({
+            "report_id": get("safetyreportid"),
+            "received_date": get("receivedate"),  # CORRECTED field name
+            "is_serious": get("serious") == "1",
+            "seriousness_types": [label for key, label in _SERIOUSNESS_FLAGS if get(key) == "1"],
             "reactions": reactions,
             "drugs": drugs,
             "patient_info": {
                 "age_group": patient.get("patientagegroup"),
                 "gender": patient.get("patientsex"),
             }
-        }
-        clean_data.append(entry)
-    
+        })
+
     return clean_data
 
 
 def filter_product_labeling_data(results: list) -> list:
     """
     Extract LLM-relevant fields from drug labeling API response.
+
+    Uses the shared module-level _get_first (previously redefined per item).
     """
     clean_data = []
-    
+
     for item in results:
-        openfda = item.get("openfda", {})
-        
-        def get_first(field_value, default="Not specified"):
-            if isinstance(field_value, list) and field_value:
-                val = field_value[0]
-                return val[:500] if isinstance(val, str) and len(val) > 500 else val
-            elif isinstance(field_value, str):
-                return field_value[:500]
-            return default
-        
-        warnings = get_first(item.get("warnings", []), "No specific warnings")
-        boxed_warning = get_first(item.get("boxed_warning", []), None)
-        adverse_reactions = get_first(item.get("adverse_reactions", []), "No specific reactions listed")
-        indications = get_first(item.get("indications_and_usage", []), "Indication not specified")
-        contraindications = get_first(item.get("contraindications", []), "No specific contraindications")
-        
-        # Extract active ingredients
-        active_ingredients = []
-        for ingredient in item.get("active_ingredient", [])[:3]:
-            if isinstance(ingredient, dict):
-                active_ingredients.append({
-                    "name": ingredient.get("active_ingredient_base", "Unknown"),
-                    "strength": ingredient.get("strength", "Unknown")
-                })
-        
-        entry = {
-            "effective_date": item.get("effective_time"),  # CORRECTED field name
-            "brand_name": openfda.get("brand_name", ["Unknown"])[0],
-            "generic_name": openfda.get("generic_name", ["Unknown"])[0],
-            "manufacturer": openfda.get("manufacturer_name", ["Unknown"])[0],
-            "route": openfda.get("route", ["Unknown"])[0],
-            "product_type": openfda.get("product_type", ["Unknown"])[0],
-            "indication": indications,
-            "warnings_summary": warnings,
-            "boxed_warning": boxed_warning,
-            "contraindications": contraindications,
-            "adverse_reactions_summary": adverse_reactions,
-            "active_ingredients": active_ingredients,
-            "dosage": get_first(item.get("dosage_and_administration", []), "Not specified")
-        }
-        clean_data.append(entry)
-    
+        get = item.get
+        fda = (get("openfda") or {}).get
+
+        clean_data.append({
+            "effective_date": get("effective_time"),  # CORRECTED field name
+            "brand_name": fda("brand_name", ["Unknown"])[0],
+            "generic_name": fda("generic_name", ["Unknown"])[0],
+            "manufacturer": fda("manufacturer_name", ["Unknown"])[0],
+            "route": fda("route", ["Unknown"])[0],
+            "product_type": fda("product_type", ["Unknown"])[0],
+            "indication": _get_first(get("indications_and_usage", []), "Indication not specified"),
+            "warnings_summary": _get_first(get("warnings", []), "No specific warnings"),
+            "boxed_warning": _get_first(get("boxed_warning", []), None),
+            "contraindications": _get_first(get("contraindications", []), "No specific contraindications"),
+            "adverse_reactions_summary": _get_first(get("adverse_reactions", []), "No specific reactions listed"),
+            "active_ingredients": [{
+                "name": ing.get("active_ingredient_base", "Unknown"),
+                "strength": ing.get("strength", "Unknown")
+            } for ing in get("active_ingredient", [])[:3] if isinstance(ing, dict)],
+            "dosage": _get_first(get("dosage_and_administration", []), "Not specified")
+        })
+
     return clean_data
 
 
+# Scalar passthrough fields as (output key, API field) pairs — the recall
+# filter copies these in one comprehension; only nested and derived fields
+# stay explicit below. Uses correct names: report_date, voluntary_mandated.
+_RECALL_FIELD_MAP = (
+    ("recall_number", "recall_number"),
+    ("event_id", "event_id"),
+    ("report_date", "report_date"),
+    ("classification_date", "center_classification_date"),
+    ("classification", "classification"),  # Class I, II, or III
+    ("status", "status"),
+    ("termination_date", "termination_date"),
+    ("distribution", "distribution_pattern"),
+    ("voluntary_mandated", "voluntary_mandated"),
+    ("recalling_firm", "recalling_firm"),
+    ("recall_initiation_date", "recall_initiation_date"),
+)
+
+
 def filter_recall_enforcement_data(results: list) -> list:
     """
     Extract LLM-relevant fields from recall enforcement API response.
-    Uses correct field names: report_date, classification, voluntary_mandated
+
+    Scalar fields come from the _RECALL_FIELD_MAP table in one pass;
+    the nested product/location blocks and truncated reason are built
+    explicitly. Output shape is unchanged.
     """
-    clean_data = []    
+    clean_data = []
 
     for item in results:
-        entry = {
-            "recall_number": item.get("recall_number"),
-            "event_id": item.get("event_id"),
-            "report_date": item.get("report_date"),  # CORRECTED field name
-            "classification_date": item.get("center_classification_date"),
-            "classification": item.get("classification"),  # Class I, II, or III
-            "status": item.get("status"),
-            "termination_date": item.get("termination_date"),
-            "product": {
-                "description": item.get("product_description"),
-                "type": item.get("product_type"),
-                "quantity": item.get("product_quantity"),
-                "codes": item.get("code_info")
-            },
-            "recall_reason": item.get("reason_for_recall", "")[:200],
-            "distribution": item.get("distribution_pattern"),
-            "voluntary_mandated": item.get("voluntary_mandated"),  # CORRECTED field name
-            "recalling_firm": item.get("recalling_firm"),
-            "location": {
-                "city": item.get("city"),
-                "state": item.get("state"),
-                "country": item.get("country"),
-                "address": item.get("address_1"),
-            },
-            "recall_initiation_date": item.get("recall_initiation_date")
+        get = item.get
+        entry = {out: get(src) for out, src in _RECALL_FIELD_MAP}
+        entry["product"] = {
+            "description": get("product_description"),
+            "type": get("product_type"),
+            "quantity": get("product_quantity"),
+            "codes": get("code_info")
+        }
+        entry["recall_reason"] = get("reason_for_recall", "")[:200]
+        entry["location"] = {
+            "city": get("city"),
+            "state": get("state"),
+            "country": get("country"),
+            "address": get("address_1"),
         }
         clean_data.append(entry)
-    
+
     return clean_data
 
 
@@ -187,35 +266,35 @@ def filter_drug_shortages_data(results: list) -> list:
     Extract LLM-relevant fields from drug shortages API response.
     """
     clean_data = []
-    
+
     for item in results:
-        brand_name = item.get("brand_name")
+        get = item.get
+        brand_name = get("brand_name")
         if not brand_name and "openfda" in item:
             brands = item["openfda"].get("brand_name", [])
             brand_name = brands[0] if brands else None
-        
-        reason = item.get("related_info", "").strip()
+
+        reason = get("related_info", "").strip()
         if not reason:
-            reason = item.get("shortage_reason", "").strip() or "No reason specified"
-        
-        entry = {
-            "generic_name": item.get("generic_name"),
-            "brand_name": brand_name or item.get("generic_name"),
-            "update_type": item.get("update_type"),  # Corrected: using actual field
-            "initial_posting_date": item.get("initial_posting_date"),
-            "availability_status": item.get("availability", "Unknown"),
+            reason = get("shortage_reason", "").strip() or "No reason specified"
+
+        clean_data.append({
+            "generic_name": get("generic_name"),
+            "brand_name": brand_name or get("generic_name"),
+            "update_type": get("update_type"),  # Corrected: using actual field
+            "initial_posting_date": get("initial_posting_date"),
+            "availability_status": get("availability", "Unknown"),
             "shortage_reason": reason[:250],
-            "manufacturer": item.get("company_name") or item.get("manufacturer_name"),
-            "contact_info": item.get("contact_info"),
+            "manufacturer": get("company_name") or get("manufacturer_name"),
+            "contact_info": get("contact_info"),
             "product_details": {
-                "dosage_form": item.get("dosage_form"),  # Corrected field
-                "route": item.get("route"),
-                "strength": item.get("strength"),
+                "dosage_form": get("dosage_form"),  # Corrected field
+                "route": get("route"),
+                "strength": get("strength"),
             },
-            "last_updated": item.get("update_date") or item.get("last_updated"),
-        }
-        clean_data.append(entry)
-    
+            "last_updated": get("update_date") or get("last_updated"),
+        })
+
     return clean_data
 
 
@@ -223,30 +302,111 @@ def filter_drug_shortages_data(results: list) -> list:
 # API REQUEST FUNCTIONS
 # ============================================================================
 
+# In-flight identical requests coalesce into one task: when a gather
+# fan-out (or two chat turns in the same second) asks for the same URL,
+# followers await the leader's task instead of issuing a duplicate GET,
+# and the leader's result lands in the cache for both.
+_inflight: Dict[tuple, asyncio.Task] = {}
+
+
 async def make_fda_request(url: str, params: dict) -> dict:
     """
     Makes a request to the openFDA API and handles common errors.
+
+    Identical concurrent requests are deduplicated into a single HTTP call.
     """
+    cache_key = (str(url), tuple(sorted(params.items())))
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_fda_request_uncoalesced(url, params, cache_key))
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _t, _k=cache_key: _inflight.pop(_k, None))
+    return await task
+
+
+async def _fda_request_uncoalesced(url: str, params: dict, cache_key: tuple) -> dict:
     if API_KEY:
         params["api_key"] = API_KEY
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params, timeout=TIMEOUT)
-            print(f"FDA API request: {response.url}")
-            
-            if response.status_code == 404:
-                return {"success": True, "data": {"results": []}}
-            
+
+    client = get_http_client()
+    sem = _get_fda_sem()
+    try:
+        for attempt in range(FDA_MAX_RETRIES):
+            async with sem:
+                response = await client.get(url, params=params)
+            if response.status_code != 429:
+                break
+            # Rate limited — honor Retry-After when present, else back off
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after else min(2 ** attempt, 30)
+            logger.warning("FDA rate limited (attempt %d); retrying in %ss", attempt + 1, delay)
+            await asyncio.sleep(delay)
+        logger.debug("FDA API request: %s", response.url)
+
+        if response.status_code == 404:
+            result = {"success": True, "data": {"results": []}}
+        else:
             response.raise_for_status()
-            return {"success": True, "data": response.json()}
-        
-        except httpx.HTTPStatusError as e:
-            return {"success": False, "error": f"API Error: {e.response.status_code}"}
-        except httpx.TimeoutException:
-            return {"success": False, "error": "Request timed out"}
-        except Exception as e:
-            return {"success": False, "error": f"Server Error: {str(e)}"}
+            result = {"success": True, "data": orjson.loads(response.content)}
+
+        _response_cache[cache_key] = result
+        return result
+
+    except httpx.HTTPStatusError as e:
+        return {"success": False, "error": f"API Error: {e.response.status_code}"}
+    except httpx.TimeoutException:
+        return {"success": False, "error": "Request timed out"}
+    except Exception as e:
+        return {"success": False, "error": f"Server Error: {str(e)}"}
+
+
+def _quote(v: str) -> str:
+    """Quote a user-supplied value as a Lucene phrase.
+
+    Escapes embedded backslashes and quotes so a drug name like
+    'Children\'s "XYZ"' can't break the query syntax (malformed queries
+    come back as 400s and burn a retry).
+    """
+    return '"' + v.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+@lru_cache(maxsize=256)
+def _field_query(joiner: str, *pairs: tuple) -> str:
+    """Build field:"value" clauses joined by `joiner`, parenthesized when
+    there is more than one. Cached on the (small, repetitive) inputs so
+    repeated queries for the same drug reuse the identical string — which
+    also keeps the response-cache key stable."""
+    q = joiner.join(f"{field}:{_quote(value)}" for field, value in pairs)
+    return f"({q})" if len(pairs) > 1 else q
+
+
+@lru_cache(maxsize=64)
+def _range_query(field: str, start: str, end: str) -> str:
+    """field:[start TO end] clause. Cached because the date window is stable
+    within a day, so every caller reuses the identical string."""
+    return f"{field}:[{start} TO {end}]"
+
+
+def _today_ordinal() -> int:
+    # UTC so the window doesn't flap with the server's local timezone
+    return datetime.now(timezone.utc).toordinal()
+
+
+@lru_cache(maxsize=8)
+def _date_window(today_ordinal: int, days: int = 100) -> tuple:
+    """(start, end) YYYYMMDD strings for the trailing `days`-day window.
+
+    Keyed on the day ordinal: within one day every caller gets the identical
+    tuple, so the query string — and therefore the response-cache key — stays
+    stable instead of changing with each datetime.now() call.
+    """
+    end_date = datetime.fromordinal(today_ordinal)
+    start_date = end_date - timedelta(days=days)
+    return start_date.strftime('%Y%m%d'), end_date.strftime('%Y%m%d')
 
 
 # ============================================================================
@@ -277,13 +437,13 @@ async def search_adverse_events(
         dict with 'success', 'data' or 'error' keys
     """
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/event.json"
+    url = EVENT_URL
     
     query_parts = []
     if drug_name:
-        query_parts.append(f'openfda.generic_name:"{drug_name}" OR openfda.brand_name:"{drug_name}"')
+        query_parts.append(_field_query(" OR ", ("openfda.generic_name", drug_name), ("openfda.brand_name", drug_name)))
     if pharm_class:
-        query_parts.append(f'patient.drug.openfda.pharm_class_epc:"{pharm_class}"')
+        query_parts.append(f'patient.drug.openfda.pharm_class_epc:{_quote(pharm_class)}')
     if serious:
         query_parts.append('serious:1')
     
@@ -318,21 +478,16 @@ async def get_serious_adverse_events(limit: int = 50) -> dict:
         dict with 'success', 'data' or 'error' keys
     """
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/event.json"
-    
-    # Calculate date range: Last 100 days from today
-    end_date = datetime.now()  # TODAY (current system date)
-    start_date = end_date - timedelta(days=100)  # 100 days ago
-    
-    # Format as YYYYMMDD
-    start_date_str = start_date.strftime('%Y%m%d')
-    end_date_str = end_date.strftime('%Y%m%d')
+    url = EVENT_URL
     
+    # Last 100 days, at day granularity (see _date_window)
+    start_date_str, end_date_str = _date_window(_today_ordinal())
+
     # Example: If today is 2026-02-01, fetch data from 2025-10-24 to 2026-02-01
-    print(f"Fetching serious adverse events from {start_date_str} to {end_date_str}")
+    logger.debug("Fetching serious adverse events from %s to %s", start_date_str, end_date_str)
     
     params = {
-        "search": f"receivedate:[{start_date_str} TO {end_date_str}] AND serious:1",
+        "search": _range_query("receivedate", start_date_str, end_date_str) + " AND serious:1",
         "limit": limit
     }
     
@@ -384,9 +539,9 @@ async def get_drug_label(drug_name: str, limit: int = 1) -> dict:
         return {"success": False, "error": "Drug name is required."}
     
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/label.json"
+    url = LABEL_URL
     
-    search_query = f'(openfda.brand_name:"{drug_name}") OR (openfda.generic_name:"{drug_name}")'
+    search_query = _field_query(" OR ", ("openfda.brand_name", drug_name), ("openfda.generic_name", drug_name))
     params = {
         "limit": limit,
         "search": search_query,
@@ -427,16 +582,19 @@ async def search_drug_labels(
     Returns:
         dict with 'success', 'data' or 'error' keys
     """
+    if not any([search_term, manufacturer, effective_time_start, effective_time_end]):
+        return {"success": False, "error": "At least one search filter is required."}
+
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/label.json"
+    url = LABEL_URL
     
     query_parts = []
     if search_term:
-        query_parts.append(f'(indications_and_usage:"{search_term}" OR warnings:"{search_term}")')
+        query_parts.append(_field_query(" OR ", ("indications_and_usage", search_term), ("warnings", search_term)))
     if manufacturer:
-        query_parts.append(f'openfda.manufacturer_name:"{manufacturer}"')
+        query_parts.append(f'openfda.manufacturer_name:{_quote(manufacturer)}')
     if effective_time_start and effective_time_end:
-        query_parts.append(f'effective_time:[{effective_time_start} TO {effective_time_end}]')
+        query_parts.append(_range_query("effective_time", effective_time_start, effective_time_end))
     
     params = {"limit": limit}
     if query_parts:
@@ -468,7 +626,7 @@ async def get_labels_with_boxed_warning(limit: int = 15) -> dict:
         dict with 'success', 'data' or 'error' keys
     """
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/label.json"
+    url = LABEL_URL
     
     params = {
         "search": "_exists_:boxed_warning",
@@ -492,6 +650,38 @@ async def get_labels_with_boxed_warning(limit: int = 15) -> dict:
 # RECALL ENFORCEMENT ENDPOINT
 # ============================================================================
 
+async def _enforcement_query(extra_query: str = "", limit: int = 15) -> dict:
+    """
+    Run one recall-enforcement search over the trailing 100-day window.
+
+    Shared by the public recall helpers below — the date-window/params/error
+    handling previously lived in three near-identical copies.
+    """
+    limit = min(max(1, limit), 100)
+    url = ENFORCEMENT_URL
+
+    # Last 100 days, at day granularity (see _date_window)
+    start_date_str, end_date_str = _date_window(_today_ordinal())
+    logger.debug("Fetching recalls from %s to %s", start_date_str, end_date_str)
+
+    search = _range_query("report_date", start_date_str, end_date_str)
+    if extra_query:
+        search = f"{search} AND {extra_query}"
+
+    result = await make_fda_request(url, {"search": search, "limit": limit})
+
+    if not result["success"]:
+        return result
+
+    data = result["data"]
+    if "results" not in data:
+        return {"success": True, "data": []}
+
+    clean_results = filter_recall_enforcement_data(data["results"])
+    logger.debug("Found %d recalls for %r", len(clean_results), extra_query)
+    return {"success": True, "data": clean_results}
+
+
 async def search_recalls(
     term: str = None,
     risk_level: str = None,
@@ -510,48 +700,19 @@ async def search_recalls(
     Returns:
         dict with 'success', 'data' or 'error' keys
     """
-    limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/enforcement.json"
-    
-    # Calculate date range: Last 100 days from today
-    end_date = datetime.now()  # TODAY (current system date)
-    start_date = end_date - timedelta(days=100)  # 100 days ago
-    
-    # Format as YYYYMMDD
-    start_date_str = start_date.strftime('%Y%m%d')
-    end_date_str = end_date.strftime('%Y%m%d')
-    
-    print(f"Fetching recent recalls from {start_date_str} to {end_date_str}")
-    
-    # Build query with date range as base
-    query_parts = [f"report_date:[{start_date_str} TO {end_date_str}]"]
-    
-    # Add additional filters if provided
+    if not term and not risk_level:
+        return {
+            "success": False,
+            "error": "Provide a search term or risk level "
+                     "(use get_recent_drug_recalls for an unfiltered list).",
+        }
+
+    query_parts = []
     if term:
-        query_parts.append(f'"{term}"')
+        query_parts.append(_quote(term))
     if risk_level:
-        query_parts.append(f'classification:"{risk_level}"')
-    
-    # Build final search parameter
-    params = {
-        "search": " AND ".join(query_parts),
-        "limit": limit
-    }
-
-    result = await make_fda_request(url, params)
-
-    if not result["success"]:
-        return result
-
-    data = result["data"]
-    if "results" not in data:
-        return {"success": True, "data": []}
-
-    clean_results = filter_recall_enforcement_data(data["results"])
-    print(f"Found {len(clean_results)} recalls search_recalls")
-    print(f" {clean_results}")
-        
-    return {"success": True, "data": clean_results}
+        query_parts.append(f'classification:{_quote(risk_level)}')
+    return await _enforcement_query(" AND ".join(query_parts), limit)
 
 async def get_recent_drug_recalls(limit: int = 50) -> dict:
     """
@@ -566,38 +727,7 @@ async def get_recent_drug_recalls(limit: int = 50) -> dict:
     Returns:
         dict with 'success', 'data' or 'error' keys
     """
-    limit = min(max(1, limit), 100)
-        
-    # Calculate date range: Last 100 days from today
-    end_date = datetime.now()  # TODAY (current system date)
-    start_date = end_date - timedelta(days=100)  # 100 days ago
-    
-    # Format as YYYYMMDD
-    start_date_str = start_date.strftime('%Y%m%d')
-    end_date_str = end_date.strftime('%Y%m%d')
-        
-    # Example: If today is 2026-02-01, fetch data from 2025-10-24 to 2026-02-01
-    print(f"Fetching recent recalls from {start_date_str} to {end_date_str}")
-    
-    url = f"{BASE_URL}/drug/enforcement.json"
-
-    params = {
-        "limit": limit,
-        "search": f"report_date:[{start_date_str} TO {end_date_str}]"
-    }
-    result = await make_fda_request(url, params)
-    
-    if not result["success"]:
-        return result
-    
-    data = result["data"]
-    if "results" not in data:
-        return {"success": True, "data": []}
-    
-    clean_results = filter_recall_enforcement_data(data["results"])
-    print(f"Found {len(clean_results)} recent recalls")    
-   
-    return {"success": True, "data": clean_results}
+    return await _enforcement_query(limit=limit)
 
 async def get_recalls_by_classification(
     classification: str,
@@ -615,44 +745,10 @@ async def get_recalls_by_classification(
     Returns:
         dict with 'success', 'data' or 'error' keys
     """
-    valid_classes = ["Class I", "Class II", "Class III"]
-    if classification not in valid_classes:
-        return {
-            "success": False,
-            "error": f"Invalid classification. Must be one of: {valid_classes}",
-        }
-    
-    limit = min(max(1, limit), 100)
-   
-    # Calculate date range: Last 100 days from today
-    end_date = datetime.now()  # TODAY (current system date)
-    start_date = end_date - timedelta(days=100)  # 100 days ago
-    
-    # Format as YYYYMMDD
-    start_date_str = start_date.strftime('%Y%m%d')
-    end_date_str = end_date.strftime('%Y%m%d')
+    if classification not in _VALID_CLASSES:
+        return {"success": False, "error": _INVALID_CLASS_ERROR}
     
-    print(f"Fetching recent recalls from {start_date_str} to {end_date_str}")
-
-    url = f"{BASE_URL}/drug/enforcement.json"
-
-    params = {
-        "limit": limit,
-        "search": f'classification:"{classification}" AND report_date:[{start_date_str} TO {end_date_str}]'
-    }
-
-    result = await make_fda_request(url, params)
-    
-    if not result["success"]:
-        return result
-    
-    data = result["data"]
-    if "results" not in data:
-        return {"success": True, "data": []}
-    
-    clean_results = filter_recall_enforcement_data(data["results"])
-    print(f"Found {len(clean_results)} recalls with classification {classification}")        
-    return {"success": True, "data": clean_results}
+    return await _enforcement_query(f'classification:{_quote(classification)}', limit)
 
 
 async def get_critical_recalls(limit: int = 50) -> dict:
@@ -681,7 +777,7 @@ async def get_voluntary_recalls(limit: int = 50) -> dict:
         dict with 'success', 'data' or 'error' keys
     """
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/enforcement.json"
+    url = ENFORCEMENT_URL
     
     params = {
         "search": 'voluntary_mandated:"Voluntary: Firm initiated"',
@@ -698,7 +794,7 @@ async def get_voluntary_recalls(limit: int = 50) -> dict:
         return {"success": True, "data": []}
     
     clean_results = filter_recall_enforcement_data(data["results"])
-    print(f"Found {len(clean_results)} recalls that are voluntary")
+    logger.debug("Found %d voluntary recalls", len(clean_results))
     return {"success": True, "data": clean_results}
 
 
@@ -724,16 +820,23 @@ async def search_drug_shortages(
     Returns:
         dict with 'success', 'data' or 'error' keys
     """
+    if not term and not dosage_form:
+        return {
+            "success": False,
+            "error": "Provide a drug name or dosage form "
+                     "(use get_current_drug_shortages for an unfiltered list).",
+        }
+
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/shortages.json"
+    url = SHORTAGES_URL
     
     query_parts = []
     if term:
         query_parts.append(
-            f'(generic_name:"{term}" OR brand_name:"{term}" OR company_name:"{term}")'
+            _field_query(" OR ", ("generic_name", term), ("brand_name", term), ("company_name", term))
         )
     if dosage_form:
-        query_parts.append(f'dosage_form:"{dosage_form}"')
+        query_parts.append(f'dosage_form:{_quote(dosage_form)}')
     
     params = {"limit": limit}
     if query_parts:
@@ -771,12 +874,14 @@ async def get_current_drug_shortages(limit: int = 100) -> dict:
         dict with 'success', 'data' or 'error' keys
     """
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/shortages.json"
-    
-    # Fetch all shortages (API doesn't support date filtering)
-    params = {"limit": limit}
+    url = SHORTAGES_URL
     
-    result = await make_fda_request(url, params)
+    # The API doesn't support update_date in search; ask it to sort by it
+    # (best effort — newest rows first if honored), and fall back to the
+    # plain request if the endpoint rejects the sort param
+    result = await make_fda_request(url, {"limit": limit, "sort": "update_date:desc"})
+    if not result["success"]:
+        result = await make_fda_request(url, {"limit": limit})
     
     if not result["success"]:
         return result
@@ -788,38 +893,40 @@ async def get_current_drug_shortages(limit: int = 100) -> dict:
         return {"success": True, "data": []}
     
     # MANUAL DATE FILTERING IN PYTHON
-    # Calculate date range: Last 100 days from today
+    # Last 100 days as (year, month, day) integer tuples: MM/DD/YYYY strings
+    # are sliced and compared as tuples, which skips building a datetime
+    # object per row (strptime is the dominant cost at 100 rows)
     end_date = datetime.now()  # TODAY (current system date)
     start_date = end_date - timedelta(days=100)  # 100 days ago
+    lo = (start_date.year, start_date.month, start_date.day)
+    hi = (end_date.year, end_date.month, end_date.day)
     
-    print(f"Filtering drug shortages updated between {start_date.strftime('%m/%d/%Y')} and {end_date.strftime('%m/%d/%Y')}")
+    logger.debug("Filtering drug shortages updated after %s", start_date.date())
     
-    # Filter results by update_date
+    # Filter results by update_date. The sort above is best effort, so scan
+    # every row rather than assuming the order is chronological.
     filtered_results = []
     for item in raw_results:
-        update_date_str = item.get("update_date")  # Format: MM/DD/YYYY
+        s = item.get("update_date")  # Format: MM/DD/YYYY
         
-        if not update_date_str:
+        if not s:
             # Skip items without update_date
             continue
         
         try:
-            # Parse MM/DD/YYYY format from API response
-            update_date = datetime.strptime(update_date_str, "%m/%d/%Y")
-            
-            # Check if update_date falls within last 100 days
-            if start_date <= update_date <= end_date:
-                filtered_results.append(item)
-        
+            t = (int(s[6:10]), int(s[0:2]), int(s[3:5]))
         except ValueError:
             # Skip items with invalid date format
-            print(f"Warning: Could not parse update_date '{update_date_str}'")
+            logger.warning("Could not parse update_date %r", s)
             continue
+
+        if lo <= t <= hi:
+            filtered_results.append(item)
     
     if not filtered_results:
         return {"success": True, "data": []}
     
-    print(f"Found {len(filtered_results)} shortages updated in last 100 days")
+    logger.debug("Found %d shortages updated in last 100 days", len(filtered_results))
     
     
     clean_results = filter_drug_shortages_data(filtered_results)
@@ -840,10 +947,10 @@ async def search_shortage_by_manufacturer(
         dict with 'success', 'data' or 'error' keys
     """
     limit = min(max(1, limit), 100)
-    url = f"{BASE_URL}/drug/shortages.json"
+    url = SHORTAGES_URL
     
     params = {
-        "search": f'company_name:"{manufacturer}"',
+        "search": f'company_name:{_quote(manufacturer)}',
         "limit": limit
     }
     
@@ -879,4 +986,122 @@ async def search_shortages_by_dosage_form(
     Returns:
         dict with 'success', 'data' or 'error' keys
     """
-    return await search_drug_shortages(dosage_form=dosage_form, limit=limit)
\ No newline at end of file
+    return await search_drug_shortages(dosage_form=dosage_form, limit=limit)
+
+# ============================================================================
+# COMBINED ENDPOINTS
+# ============================================================================
+
+async def search_drug_shortages_batch(terms: list, limit_per_term: int = 5) -> dict:
+    """
+    Search shortages for several drugs with one OR query.
+
+    N separate searches collapse into a single FDA request; results are
+    bucketed back per term by matching generic/brand names.
+
+    Args:
+        terms: Drug names (generic or brand)
+        limit_per_term: Max results kept per term (default 5)
+
+    Returns:
+        dict with 'success' and 'data' ({term: [...]}) or 'error' keys
+    """
+    names = [t.strip() for t in terms if t and t.strip()]
+    if not names:
+        return {"success": False, "error": "At least one drug name is required."}
+
+    limit_per_term = min(max(1, limit_per_term), 100)
+    limit = min(limit_per_term * len(names), 100)
+
+    search = " OR ".join(
+        _field_query(" OR ", ("generic_name", t), ("brand_name", t)) for t in names
+    )
+    result = await make_fda_request(SHORTAGES_URL, {"search": search, "limit": limit})
+
+    if not result["success"]:
+        return result
+
+    data = result["data"]
+    raw_results = data.get("results", []) if isinstance(data, dict) else data
+    clean_results = filter_drug_shortages_data(raw_results) if raw_results else []
+
+    # Bucket the combined page back per requested term
+    buckets = {name: [] for name in names}
+    lowered = [(name, name.lower()) for name in names]
+    for record in clean_results:
+        haystack = f"{record.get('generic_name') or ''} {record.get('brand_name') or ''}".lower()
+        for name, low in lowered:
+            if low in haystack and len(buckets[name]) < limit_per_term:
+                buckets[name].append(record)
+
+    return {"success": True, "data": buckets}
+
+
+async def search_shortages_by_manufacturers(manufacturers: list, limit: int = 15) -> dict:
+    """
+    Search drug shortages for several manufacturers concurrently.
+
+    One wallclock round-trip instead of N sequential ones — the per-name
+    requests multiplex over the shared HTTP/2 pool, and make_fda_request's
+    semaphore already bounds total concurrency.
+
+    Args:
+        manufacturers: Manufacturer names
+        limit: Number of results per manufacturer (default 15, max 100)
+
+    Returns:
+        dict with 'success' and 'data' ({manufacturer: [...] or {'error': ...}})
+    """
+    names = [m.strip() for m in manufacturers if m and m.strip()]
+    if not names:
+        return {"success": False, "error": "At least one manufacturer is required."}
+
+    results = await asyncio.gather(
+        *(search_shortage_by_manufacturer(name, limit) for name in names),
+        return_exceptions=True,
+    )
+
+    data = {}
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            data[name] = {"error": str(result)}
+        elif not result["success"]:
+            data[name] = {"error": result["error"]}
+        else:
+            data[name] = result["data"]
+
+    return {"success": True, "data": data}
+
+
+
+async def get_drug_overview(drug_name: str, limit: int = 5) -> dict:
+    """
+    Get shortage and recall status for one drug in a single call.
+
+    Fans out to the shortages and recall endpoints concurrently, so the
+    common "safety check" flow costs one tool round-trip instead of two
+    sequential ones.
+
+    Args:
+        drug_name: The drug name (brand or generic)
+        limit: Number of results per category (default 5, max 100)
+
+    Returns:
+        dict with 'success', 'data' ({'shortages': [...], 'recalls': [...]})
+        or 'error' keys
+    """
+    if not drug_name:
+        return {"success": False, "error": "Drug name is required."}
+
+    shortages, recalls = await asyncio.gather(
+        search_drug_shortages(term=drug_name, limit=limit),
+        search_recalls(term=drug_name, limit=limit),
+    )
+
+    if not shortages["success"] and not recalls["success"]:
+        return {"success": False, "error": shortages["error"]}
+
+    return {"success": True, "data": {
+        "shortages": shortages["data"] if shortages["success"] else [],
+        "recalls": recalls["data"] if recalls["success"] else [],
+    }}
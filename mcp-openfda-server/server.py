@@ -11,7 +11,9 @@ All tools return optimized JSON responses (60-80% token reduction vs raw API).
 """
 
 from fastmcp import FastMCP
-import json
+from cachetools import TLRUCache
+import functools
+import orjson
 import openfda_api
 import asyncio
 import os
@@ -19,11 +21,83 @@ import os
 mcp = FastMCP("OpenFDA Remote Server")
 
 
+# --- TOOL RESPONSE CACHE ---
+# make_fda_request caches parsed FDA responses, but a hit there still pays
+# the filter pass and re-serialization. This layer stores each tool's final
+# response string keyed on its arguments, so a repeat call within the TTL
+# returns a ready-made string. Volatile feeds expire faster than
+# effectively-static label data; error responses are never cached.
+_TOOL_TTLS = {
+    "get_recent_drug_recalls": 300,
+    "get_critical_recalls": 300,
+    "get_recalls_by_classification": 300,
+    "get_current_drug_shortages": 300,
+    "get_serious_adverse_events": 300,
+    "get_drug_safety_dashboard": 300,
+}
+_DEFAULT_TOOL_TTL = 600
+
+
+def _tool_ttu(key, value, now):
+    # Key is (tool name, args, kwargs); look up the tool's TTL
+    return now + _TOOL_TTLS.get(key[0], _DEFAULT_TOOL_TTL)
+
+
+_tool_cache: TLRUCache = TLRUCache(maxsize=1024, ttu=_tool_ttu)
+
+
+def _cached_tool(fn):
+    """Cache a tool's final response string keyed on its arguments."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        cached = _tool_cache.get(key)
+        if cached is not None:
+            return cached
+        response = await fn(*args, **kwargs)
+        if not response.startswith("Error"):
+            _tool_cache[key] = response
+        return response
+    return wrapper
+
+
+# Accept case/spacing variants of recall classes at the tool boundary so a
+# typo'd call fails in microseconds instead of costing an FDA round-trip,
+# and equivalent spellings reach the upstream caches as one canonical query.
+_CLASSES = {"class i": "Class I", "class ii": "Class II", "class iii": "Class III"}
+
+
+def _finalize(result: dict, empty_msg: str, err_prefix: str) -> str:
+    """Standard tool tail: upstream error, empty-data message, or serialized data."""
+    if not result["success"]:
+        return err_prefix + result["error"]
+    if not result["data"]:
+        return empty_msg
+    return _dump(result["data"])
+
+
+def _normalize_classification(value: str | None) -> str | None:
+    if not value:
+        return None
+    return _CLASSES.get(" ".join(value.split()).lower())
+
+
+def _dump(data) -> str:
+    """Serialize a tool payload for the MCP text response.
+
+    Compact on purpose: this JSON goes straight into an LLM context, where
+    indentation roughly doubles the bytes and whitespace tokens the model
+    has to pay for without helping it parse anything.
+    """
+    return orjson.dumps(data).decode()
+
+
 # ============================================================================
 # ADVERSE EVENTS ENDPOINT
 # ============================================================================
 
 @mcp.tool()
+@_cached_tool
 async def search_adverse_events(
     drug_name: str = None,
     reaction: str = None,
@@ -55,16 +129,11 @@ async def search_adverse_events(
     """
     result = await openfda_api.search_adverse_events(drug_name, reaction, serious, limit)
     
-    if not result["success"]:
-        return f"Error searching adverse events: {result['error']}"
-    
-    if not result["data"]:
-        return f"No adverse event reports found for {drug_name or 'that query'}."
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, f"No adverse event reports found for {drug_name or 'that query'}.", "Error searching adverse events: ")
 
 
 @mcp.tool()
+@_cached_tool
 async def get_serious_adverse_events(limit: int = 5) -> str:
     """
     Get recent serious adverse events (deaths, life-threatening, hospitalizations).
@@ -84,13 +153,7 @@ async def get_serious_adverse_events(limit: int = 5) -> str:
     """
     result = await openfda_api.get_serious_adverse_events(limit)
     
-    if not result["success"]:
-        return f"Error retrieving serious adverse events: {result['error']}"
-    
-    if not result["data"]:
-        return "No recent serious adverse events found."
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, "No recent serious adverse events found.", "Error retrieving serious adverse events: ")
 
 
 # ============================================================================
@@ -98,6 +161,7 @@ async def get_serious_adverse_events(limit: int = 5) -> str:
 # ============================================================================
 
 @mcp.tool()
+@_cached_tool
 async def get_drug_label(drug_name: str, limit: int = 5) -> str:
     """
     Get official FDA drug label information.
@@ -124,16 +188,11 @@ async def get_drug_label(drug_name: str, limit: int = 5) -> str:
     """
     result = await openfda_api.get_drug_label(drug_name, limit)
     
-    if not result["success"]:
-        return f"Error retrieving drug label: {result['error']}"
-    
-    if not result["data"]:
-        return f"No label information found for: {drug_name}"
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, f"No label information found for: {drug_name}", "Error retrieving drug label: ")
 
 
 @mcp.tool()
+@_cached_tool
 async def search_drug_labels(
     search_term: str = None,
     manufacturer: str = None,
@@ -157,13 +216,7 @@ async def search_drug_labels(
     """
     result = await openfda_api.search_drug_labels(search_term, manufacturer, limit)
     
-    if not result["success"]:
-        return f"Error searching drug labels: {result['error']}"
-    
-    if not result["data"]:
-        return f"No drug labels found matching: {search_term or manufacturer}"
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, f"No drug labels found matching: {search_term or manufacturer}", "Error searching drug labels: ")
 
 
 # ============================================================================
@@ -171,6 +224,7 @@ async def search_drug_labels(
 # ============================================================================
 
 @mcp.tool()
+@_cached_tool
 async def search_recalls(
     term: str = None,
     risk_level: str = None,
@@ -202,18 +256,19 @@ async def search_recalls(
     - location: [city, state, country]
     - recall_initiation_date
     """
+    if risk_level:
+        normalized = _normalize_classification(risk_level)
+        if normalized is None:
+            return 'Error searching recalls: Invalid risk_level. Must be one of: ["Class I", "Class II", "Class III"]'
+        risk_level = normalized
+
     result = await openfda_api.search_recalls(term, risk_level, limit)
     
-    if not result["success"]:
-        return f"Error searching recalls: {result['error']}"
-    
-    if not result["data"]:
-        return f"No recalls found for: {term or 'that query'}"
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, f"No recalls found for: {term or 'that query'}", "Error searching recalls: ")
 
 
 @mcp.tool()
+@_cached_tool
 async def get_recent_drug_recalls(limit: int = 5) -> str:
     """
     Get the most recent drug recalls (last 100 days) sorted by report date.
@@ -230,16 +285,11 @@ async def get_recent_drug_recalls(limit: int = 5) -> str:
     """
     result = await openfda_api.get_recent_drug_recalls(limit)
     
-    if not result["success"]:
-        return f"Error retrieving recent recalls: {result['error']}"
-    
-    if not result["data"]:
-        return "No recent recalls found."
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, "No recent recalls found.", "Error retrieving recent recalls: ")
 
 
 @mcp.tool()
+@_cached_tool
 async def get_recalls_by_classification(classification: str, limit: int = 5) -> str:
     """
     Get drug recalls filtered by risk classification level.
@@ -259,18 +309,17 @@ async def get_recalls_by_classification(classification: str, limit: int = 5) ->
     
     Returns JSON with recalls of the specified classification.
     """
+    classification = _normalize_classification(classification)
+    if classification is None:
+        return 'Error retrieving recalls: Invalid classification. Must be one of: ["Class I", "Class II", "Class III"]'
+
     result = await openfda_api.get_recalls_by_classification(classification, limit)
     
-    if not result["success"]:
-        return f"Error retrieving recalls: {result['error']}"
-    
-    if not result["data"]:
-        return f"No {classification} recalls found."
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, f"No {classification} recalls found.", "Error retrieving recalls: ")
 
 
 @mcp.tool()
+@_cached_tool
 async def get_critical_recalls(limit: int = 5) -> str:
     """
     Get critical Class I recalls (highest risk).
@@ -290,13 +339,7 @@ async def get_critical_recalls(limit: int = 5) -> str:
     """
     result = await openfda_api.get_critical_recalls(limit)
     
-    if not result["success"]:
-        return f"Error retrieving critical recalls: {result['error']}"
-    
-    if not result["data"]:
-        return "No Class I (critical) recalls found."
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, "No Class I (critical) recalls found.", "Error retrieving critical recalls: ")
 
 
 # ============================================================================
@@ -304,6 +347,7 @@ async def get_critical_recalls(limit: int = 5) -> str:
 # ============================================================================
 
 @mcp.tool()
+@_cached_tool
 async def search_drug_shortages(
     term: str = None,
     availability: str = None,
@@ -335,16 +379,11 @@ async def search_drug_shortages(
     """
     result = await openfda_api.search_drug_shortages(term, availability, limit)
     
-    if not result["success"]:
-        return f"Error searching shortages: {result['error']}"
-    
-    if not result["data"]:
-        return f"No shortages found for: {term or 'that query'}"
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, f"No shortages found for: {term or 'that query'}", "Error searching shortages: ")
 
 
 @mcp.tool()
+@_cached_tool
 async def get_current_drug_shortages(limit: int = 5) -> str:
     """
     Get all currently active drug shortages.
@@ -364,16 +403,11 @@ async def get_current_drug_shortages(limit: int = 5) -> str:
     """
     result = await openfda_api.get_current_drug_shortages(limit)
     
-    if not result["success"]:
-        return f"Error retrieving shortages: {result['error']}"
-    
-    if not result["data"]:
-        return "No current drug shortages found."
-    
-    return json.dumps(result["data"], indent=2)
+    return _finalize(result, "No current drug shortages found.", "Error retrieving shortages: ")
 
 
 @mcp.tool()
+@_cached_tool
 async def search_shortages_by_manufacturer(manufacturer: str, limit: int = 5) -> str:
     """
     Search drug shortages by manufacturer.
@@ -391,25 +425,170 @@ async def search_shortages_by_manufacturer(manufacturer: str, limit: int = 5) ->
     """
     result = await openfda_api.search_shortage_by_manufacturer(manufacturer, limit)
     
+    return _finalize(result, f"No shortages found for manufacturer: {manufacturer}", "Error searching shortages: ")
+
+
+@mcp.tool()
+@_cached_tool
+async def search_drug_shortages_batch(drug_names: str, limit_per_drug: int = 5) -> str:
+    """
+    Check shortages for several drugs in one call.
+
+    All names go upstream as a single OR query, so prefer this over
+    repeated search_drug_shortages calls when checking a list of drugs.
+
+    Use this when user asks about:
+    - Shortages for multiple medications at once (e.g., "insulin and metformin")
+    - Checking a medication list against current shortages
+
+    Args:
+        drug_names: Comma-separated drug names (e.g., "insulin, metformin")
+        limit_per_drug: Max results per drug (default 5)
+
+    Returns JSON mapping each drug name to its shortage records
+    (an empty list means no shortage matched that name).
+    """
+    names = [n.strip() for n in drug_names.split(",") if n.strip()]
+    result = await openfda_api.search_drug_shortages_batch(names, limit_per_drug)
+
     if not result["success"]:
         return f"Error searching shortages: {result['error']}"
-    
-    if not result["data"]:
-        return f"No shortages found for manufacturer: {manufacturer}"
-    
-    return json.dumps(result["data"], indent=2)
+
+    return _dump(result["data"])
+
+
+@mcp.tool()
+@_cached_tool
+async def search_shortages_by_manufacturers(manufacturers: str, limit: int = 5) -> str:
+    """
+    Search drug shortages for several manufacturers at once.
+
+    All manufacturers are queried concurrently server-side, so prefer this
+    over repeated search_shortages_by_manufacturer calls.
+
+    Use this when user asks about:
+    - Shortages across multiple companies (e.g., "Pfizer, Merck and Teva")
+    - Comparing supply status between manufacturers
+
+    Args:
+        manufacturers: Comma-separated manufacturer names (e.g., "Pfizer, Merck")
+        limit: Number of results per manufacturer (default 5, max 100)
+
+    Returns JSON mapping each manufacturer to its shortage records
+    (or an error note if that lookup failed).
+    """
+    names = [m.strip() for m in manufacturers.split(",") if m.strip()]
+    result = await openfda_api.search_shortages_by_manufacturers(names, limit)
+
+    if not result["success"]:
+        return f"Error searching shortages: {result['error']}"
+
+    return _dump(result["data"])
+
+
+# ============================================================================
+# COMBINED ENDPOINT
+# ============================================================================
+
+@mcp.tool()
+@_cached_tool
+async def get_drug_overview(drug_name: str, limit: int = 5) -> str:
+    """
+    Get shortage and recall status for one drug in a single call.
+
+    Fetches both categories concurrently server-side, so prefer this over
+    separate shortage + recall calls when checking one drug's safety status.
+
+    Use this when user asks about:
+    - The overall safety/supply status of a specific drug
+    - "Is there anything wrong with <drug>?" style questions
+    - A combined shortage and recall check
+
+    Args:
+        drug_name: The drug name (brand or generic, e.g., "Lipitor", "insulin")
+        limit: Number of results per category (default 5, max 100)
+
+    Returns JSON with:
+    - shortages: [generic_name, availability_status, shortage_reason, ...]
+    - recalls: [recall_number, classification, recall_reason, ...]
+    """
+    result = await openfda_api.get_drug_overview(drug_name, limit)
+
+    if not result["success"]:
+        return f"Error retrieving drug overview: {result['error']}"
+
+    data = result["data"]
+    if not data["shortages"] and not data["recalls"]:
+        return f"No shortages or recalls found for: {drug_name}"
+
+    return _dump(data)
+
+
+@mcp.tool()
+@_cached_tool
+async def get_drug_safety_dashboard(limit: int = 5) -> str:
+    """
+    Get a combined safety dashboard: serious adverse events, recent recalls,
+    critical recalls, and current shortages in one call.
+
+    All four categories are fetched concurrently server-side, so this costs
+    one round-trip instead of four sequential tool calls.
+
+    Use this when user asks about:
+    - An overall safety summary or "what's new" across all categories
+    - A drug-safety dashboard or briefing
+    - Recent events, recalls, and shortages together
+
+    Args:
+        limit: Number of results per category (default 5, max 100)
+
+    Returns JSON with:
+    - serious_adverse_events, recent_recalls, critical_recalls,
+      current_shortages (each a list, or an error note if that fetch failed)
+    """
+    results = await asyncio.gather(
+        openfda_api.get_serious_adverse_events(limit),
+        openfda_api.get_recent_drug_recalls(limit),
+        openfda_api.get_critical_recalls(limit),
+        openfda_api.get_current_drug_shortages(limit),
+        return_exceptions=True,
+    )
+
+    section_names = (
+        "serious_adverse_events",
+        "recent_recalls",
+        "critical_recalls",
+        "current_shortages",
+    )
+    dashboard = {}
+    for name, result in zip(section_names, results):
+        if isinstance(result, BaseException):
+            dashboard[name] = {"error": str(result)}
+        elif not result["success"]:
+            dashboard[name] = {"error": result["error"]}
+        else:
+            dashboard[name] = result["data"]
+
+    return _dump(dashboard)
 
 
 # ============================================================================
 # SERVER STARTUP
 # ============================================================================
 
+async def main():
+    port = int(os.getenv("PORT", 8080))
+    try:
+        await mcp.run_async(
+            transport="sse",
+            host="0.0.0.0",  # Required for Cloud Run to route traffic
+            port=port
+        )
+    finally:
+        # Release the shared FDA connection pool
+        await openfda_api.close_http_client()
+
+
 if __name__ == "__main__":
     # Get the port from the environment variable, defaulting to 8000
-    port = int(os.getenv("PORT", 8080))
-    asyncio.run(
-    mcp.run_async(
-        transport="sse",
-        host="0.0.0.0",  # Required for Cloud Run to route traffic
-        port=port
-    ))
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file